@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+from storage import symbol_filename, write_json_atomic
+from symbol_index import document_id
+
+# Quant fields whose movement makes a category's previous analysis stale
+MATERIAL_QUANT_FIELDS = {
+    'expert_analysis': ['current_price', 'pct_from_high', 'pe_ratio', 'eps'],
+    'company_news': ['current_price'],
+    'financial_performance': ['current_price', 'eps', 'pe_ratio', 'roe', 'debt_to_equity', 'book_value'],
+    'market_sentiment': ['price_change_1d', 'volatility', 'indicators.rsi_14', 'indicators.macd_histogram'],
+    'risk_assessment': ['volatility', 'beta', 'pct_from_high', 'pct_from_low', 'indicators.max_drawdown']
+}
+
+# (absolute, relative) change a field may drift before it counts as material.
+# Percent-valued fields use absolute points, everything else 2% of the old value.
+QUANT_TOLERANCES = {
+    'price_change_1d': (1.0, 0),
+    'pct_from_high': (2.0, 0),
+    'pct_from_low': (2.0, 0),
+    'volatility': (2.0, 0),
+    'roe': (1.0, 0),
+    'indicators.rsi_14': (5.0, 0),
+    'indicators.max_drawdown': (2.0, 0)
+}
+DEFAULT_TOLERANCE = (0, 0.02)
+
+
+def _field(quant_data: Dict, path: str):
+    value = quant_data or {}
+    for part in path.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _changed(field: str, old, new) -> bool:
+    numeric = (int, float)
+    if isinstance(old, numeric) and isinstance(new, numeric) and not isinstance(old, bool) and not isinstance(new, bool):
+        absolute, relative = QUANT_TOLERANCES.get(field, DEFAULT_TOLERANCE)
+        return abs(new - old) > max(absolute, relative * abs(old))
+    return old != new
+
+
+class AnalysisMemory:
+    """Last analysis per symbol, with the evidence each category was generated from.
+
+    For every category it keeps the document ids it was written from and the
+    values of its material quant fields. A later request reuses a category's
+    analysis while its document set is unchanged, its quant fields have not
+    moved past their tolerances and it is younger than max_age_seconds; only
+    the other categories go back to the LLM. State is persisted per symbol.
+    """
+
+    def __init__(self, store_dir: str, max_age_seconds: float = 6 * 3600):
+        self.store_dir = store_dir
+        self.max_age_seconds = max_age_seconds
+        self.reused = 0
+        self.regenerated = 0
+        os.makedirs(store_dir, exist_ok=True)
+
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.store_dir, f"{symbol_filename(symbol)}.json")
+
+    def _load(self, symbol: str) -> Dict:
+        symbol = symbol.upper()
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = {}
+            path = self._path(symbol)
+            if os.path.exists(path):
+                try:
+                    with open(path) as f:
+                        state = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Error loading previous analysis for {symbol}: {e}")
+            self._symbols[symbol] = state
+        return state
+
+    def _save(self, symbol: str, state: Dict):
+        write_json_atomic(self._path(symbol), state)
+
+    @staticmethod
+    def _evidence(category: str, docs: List[Dict], quant_data: Dict) -> Dict:
+        return {
+            'docs': sorted(document_id(doc) for doc in docs),
+            'quant': {field: _field(quant_data, field) for field in MATERIAL_QUANT_FIELDS.get(category, [])}
+        }
+
+    def reusable(self, symbol: str, categorized_docs: Dict[str, List[Dict]], quant_data: Dict) -> Dict[str, Dict]:
+        """Previous analyses for the categories whose evidence has not materially changed"""
+        now = time.time()
+        reused = {}
+        with self._lock:
+            state = self._load(symbol)
+            for category, docs in categorized_docs.items():
+                previous = state.get(category)
+                if not previous or now - previous['generated_at'] > self.max_age_seconds:
+                    continue
+                evidence = self._evidence(category, docs, quant_data)
+                if evidence['docs'] != previous['docs']:
+                    continue
+                if any(_changed(field, previous['quant'].get(field), value) for field, value in evidence['quant'].items()):
+                    continue
+                reused[category] = dict(previous['analysis'], reused=True,
+                                        generated_at=datetime.fromtimestamp(previous['generated_at']).isoformat())
+            self.reused += len(reused)
+            self.regenerated += len(categorized_docs) - len(reused)
+        return reused
+
+    def remember(self, symbol: str, categorized_docs: Dict[str, List[Dict]], quant_data: Dict, analyses: Dict[str, Dict]):
+        """Record freshly generated analyses together with the evidence they were written from"""
+        now = time.time()
+        with self._lock:
+            state = self._load(symbol)
+            for category, analysis in analyses.items():
+                if category in categorized_docs:
+                    state[category] = dict(self._evidence(category, categorized_docs[category], quant_data),
+                                           analysis=analysis, generated_at=now)
+            if analyses:
+                self._save(symbol, state)
+
+    def stats(self) -> Dict:
+        considered = self.reused + self.regenerated
+        return {
+            'symbols': len(self._symbols),
+            'reused_categories': self.reused,
+            'regenerated_categories': self.regenerated,
+            'reuse_rate': round(self.reused / considered, 4) if considered else 0.0
+        }
@@ -1,12 +1,62 @@
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, Response, render_template_string, request, jsonify
 import os
+import json
+import threading
 from dotenv import load_dotenv
-from rag_system import StockRAGSystem
 
 load_dotenv()
 
 app = Flask(__name__)
 
+# Shared, preloaded RAG system (created once per process at startup)
+rag_system = None
+rag_ready = threading.Event()
+rag_load_error = None
+RAG_STARTUP_TIMEOUT = float(os.getenv('RAG_STARTUP_TIMEOUT', '120'))
+
+# Quick-pick chips on the front page; refreshed in the background ahead of the watchlist
+POPULAR_SYMBOLS = ['AAPL', 'GOOGL', 'TSLA', 'MSFT', 'NVDA', 'AMZN']
+watchlist_scheduler = None
+
+def start_scheduler(system):
+    """Keep the popular chips and WATCHLIST symbols warm in the background"""
+    global watchlist_scheduler
+    from scheduler import WatchlistScheduler, parse_source_budgets
+    scheduler = WatchlistScheduler(
+        lambda symbol, horizon: system.refresh_symbol(symbol, min_fresh=horizon),
+        max_concurrency=int(os.getenv('SCHEDULER_CONCURRENCY', '2')),
+        open_interval=float(os.getenv('SCHEDULER_INTERVAL_MARKET_OPEN', '240')),
+        closed_interval=float(os.getenv('SCHEDULER_INTERVAL_MARKET_CLOSED', '3600')),
+        jitter=float(os.getenv('SCHEDULER_JITTER', '0.1')),
+        source_budgets=parse_source_budgets(os.getenv('SCHEDULER_SOURCE_BUDGETS'))
+    )
+    scheduler.add_many(POPULAR_SYMBOLS, priority=0)
+    scheduler.add_many([symbol.strip() for symbol in os.getenv('WATCHLIST', '').split(',') if symbol.strip()], priority=1)
+    scheduler.start()
+    watchlist_scheduler = scheduler
+
+def load_rag_system():
+    """Create the shared StockRAGSystem and warm the embedding model"""
+    global rag_system, rag_load_error
+    try:
+        # Imported here rather than at the top: parse workers re-import this module as
+        # __mp_main__ and must not pull in torch, faiss and friends just to parse HTML
+        from rag_system import StockRAGSystem
+        system = StockRAGSystem()
+        system.warm_up()
+        rag_system = system
+        rag_ready.set()
+        print("✅ Embedding model loaded and warmed")
+        if os.getenv('SCHEDULER', '1') != '0':
+            start_scheduler(system)
+    except Exception as e:
+        rag_load_error = str(e)
+        print(f"Error loading RAG system: {e}")
+
+# Parse workers import the main module as __mp_main__; only the server process loads the model
+if __name__ != '__mp_main__':
+    threading.Thread(target=load_rag_system, name='rag-loader', daemon=True).start()
+
 # New York Times-style HTML template
 HTML = '''
 <!DOCTYPE html>
@@ -443,12 +493,9 @@ HTML = '''
         </div>
         
         <div class="popular-stocks">
-            <div class="stock-chip" onclick="quickAnalyze('AAPL')">AAPL</div>
-            <div class="stock-chip" onclick="quickAnalyze('GOOGL')">GOOGL</div>
-            <div class="stock-chip" onclick="quickAnalyze('TSLA')">TSLA</div>
-            <div class="stock-chip" onclick="quickAnalyze('MSFT')">MSFT</div>
-            <div class="stock-chip" onclick="quickAnalyze('NVDA')">NVDA</div>
-            <div class="stock-chip" onclick="quickAnalyze('AMZN')">AMZN</div>
+            {% for symbol in popular_symbols %}
+            <div class="stock-chip" onclick="quickAnalyze('{{ symbol }}')">{{ symbol }}</div>
+            {% endfor %}
         </div>
     </div>
     
@@ -470,7 +517,202 @@ HTML = '''
             analyze();
         }
         
-        async function analyze() {
+        const gridCategories = [
+            {key: 'expert_analysis', title: 'Expert Analysis', position: 'left'},
+            {key: 'financial_performance', title: 'Financial Performance', position: 'center'},
+            {key: 'company_news', title: 'Company News', position: 'right'}
+        ];
+        const sidebarCategories = ['market_sentiment', 'risk_assessment'];
+        let activeStream = null;
+        
+        function formatFreshness(result) {
+            // How long ago the analysis was computed, from the response's age_seconds
+            if (!result || result.age_seconds === undefined) return 'Real-time market data analysis';
+            const age = result.age_seconds;
+            let text = 'Updated just now';
+            if (age >= 3600) {
+                text = `Updated ${Math.floor(age / 3600)} hr ago`;
+            } else if (age >= 60) {
+                text = `Updated ${Math.floor(age / 60)} min ago`;
+            }
+            return result.stale ? `${text} (refreshing)` : text;
+        }
+        
+        function renderHeader(stock, quantData, result) {
+            return `
+                <div class="main-story">
+                    <div class="article-date">${new Date().toLocaleDateString('en-US', {
+                        weekday: 'long',
+                        year: 'numeric', 
+                        month: 'long',
+                        day: 'numeric'
+                    })}</div>
+                    <h1 class="main-headline">${stock} Stock Analysis: ${quantData ? quantData.company_name : stock}</h1>
+                    <div class="main-byline">By Financial AI Analyst | ${formatFreshness(result)}</div>
+                </div>
+            `;
+        }
+        
+        function renderQuantData(qData) {
+            const changeColor = qData.price_change_1d >= 0 ? '#28a745' : '#dc3545';
+            const marketCapFormatted = typeof qData.market_cap === 'number' ? 
+                (qData.market_cap / 1e9).toFixed(1) + 'B' : qData.market_cap;
+            
+            let html = `
+                <div class="stats-bar">
+                    <div class="stat-item">
+                        <span class="stat-number" style="color: ${changeColor}">$${qData.current_price}</span>
+                        <span class="stat-label">Current Price</span>
+                    </div>
+                    <div class="stat-item">
+                        <span class="stat-number" style="color: ${changeColor}">${qData.price_change_1d > 0 ? '+' : ''}${qData.price_change_1d}%</span>
+                        <span class="stat-label">1-Day Change</span>
+                    </div>
+                    <div class="stat-item">
+                        <span class="stat-number">${qData.volatility}%</span>
+                        <span class="stat-label">Volatility (Annual)</span>
+                    </div>
+                    <div class="stat-item">
+                        <span class="stat-number">${marketCapFormatted}</span>
+                        <span class="stat-label">Market Cap</span>
+                    </div>
+                    <div class="stat-item">
+                        <span class="stat-number">${qData.pe_ratio !== 'N/A' ? qData.pe_ratio.toFixed(1) : 'N/A'}</span>
+                        <span class="stat-label">P/E Ratio</span>
+                    </div>
+                </div>
+            `;
+            
+            // Add detailed metrics section
+            html += `
+                <div style="background: #f8f8f8; padding: 20px; margin: 20px 0; border: 1px solid #ddd;">
+                    <h3 style="margin-bottom: 15px; text-align: center; font-size: 18px;">Key Financial Metrics</h3>
+                    <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px;">
+                        <div style="text-align: center;">
+                            <div style="font-size: 16px; font-weight: bold;">52-Week Range</div>
+                            <div style="color: #666;">$${qData.week_52_low} - $${qData.week_52_high}</div>
+                            <div style="font-size: 12px; color: ${qData.pct_from_high < -10 ? '#28a745' : '#666'};">
+                                ${qData.pct_from_high}% from high
+                            </div>
+                        </div>
+                        <div style="text-align: center;">
+                            <div style="font-size: 16px; font-weight: bold;">Beta</div>
+                            <div style="color: #666;">${qData.beta !== 'N/A' ? qData.beta.toFixed(2) : 'N/A'}</div>
+                            <div style="font-size: 12px; color: #999;">Market volatility</div>
+                        </div>
+                        <div style="text-align: center;">
+                            <div style="font-size: 16px; font-weight: bold;">Dividend Yield</div>
+                            <div style="color: #666;">${qData.dividend_yield.toFixed(2)}%</div>
+                            <div style="font-size: 12px; color: #999;">Annual dividend</div>
+                        </div>
+                        <div style="text-align: center;">
+                            <div style="font-size: 16px; font-weight: bold;">EPS</div>
+                            <div style="color: #666;">${qData.eps !== 'N/A' ? '$' + qData.eps.toFixed(2) : 'N/A'}</div>
+                            <div style="font-size: 12px; color: #999;">Earnings per share</div>
+                        </div>
+                        <div style="text-align: center;">
+                            <div style="font-size: 16px; font-weight: bold;">Avg Volume</div>
+                            <div style="color: #666;">${(qData.volume_avg / 1e6).toFixed(1)}M</div>
+                            <div style="font-size: 12px; color: #999;">Daily trading volume</div>
+                        </div>
+                    </div>
+                    ${qData.sector !== 'N/A' ? `
+                        <div style="text-align: center; margin-top: 15px; padding-top: 15px; border-top: 1px solid #ddd;">
+                            <strong>Sector:</strong> ${qData.sector} | <strong>Industry:</strong> ${qData.industry}
+                        </div>
+                    ` : ''}
+                </div>
+            `;
+            return html;
+        }
+        
+        function renderArticleStats(data) {
+            // Fallback stats bar for news-only analysis
+            if (!(data.total_articles && data.relevant_articles)) return '';
+            return `
+                <div class="stats-bar">
+                    <div class="stat-item">
+                        <span class="stat-number">${data.total_articles}</span>
+                        <span class="stat-label">Sources Analyzed</span>
+                    </div>
+                    <div class="stat-item">
+                        <span class="stat-number">${data.relevant_articles}</span>
+                        <span class="stat-label">Key Articles</span>
+                    </div>
+                    <div class="stat-item">
+                        <span class="stat-number">${Object.keys(data.categories).length - 1}</span>
+                        <span class="stat-label">Analysis Sections</span>
+                    </div>
+                </div>
+            `;
+        }
+        
+        function renderSources(sources) {
+            return `
+                <div class="sources-section">
+                    <div class="sources-title">Sources</div>
+                    <div class="sources-list">Analysis compiled from: ${sources}</div>
+                </div>
+            `;
+        }
+        
+        function renderError(title, message) {
+            document.getElementById('output').innerHTML = `
+                <div class="error">
+                    <h3>❌ ${title}</h3>
+                    <p>${message}</p>
+                </div>
+            `;
+        }
+        
+        function renderAnalysis(stock, data) {
+            // Create newspaper-style layout
+            let html = renderHeader(stock, data.quantitative_data, data);
+            
+            // Add quantitative data bar
+            if (data.quantitative_data) {
+                html += renderQuantData(data.quantitative_data);
+            } else {
+                html += renderArticleStats(data);
+            }
+            
+            // Create three-column newspaper layout
+            html += '<div class="story-grid">';
+            
+            gridCategories.forEach((cat, index) => {
+                if (data.categories[cat.key]) {
+                    const category = data.categories[cat.key];
+                    html += `
+                        <div class="story-column">
+                            <div class="column-header">${category.title}</div>
+                            <div class="story-content">${category.content}</div>
+                        </div>
+                    `;
+                }
+            });
+            
+            html += '</div>'; // Close story-grid
+            
+            // Add sidebar stories for remaining categories
+            sidebarCategories.forEach(categoryKey => {
+                if (data.categories[categoryKey]) {
+                    const category = data.categories[categoryKey];
+                    html += `
+                        <div class="sidebar-story">
+                            <div class="sidebar-headline">${category.title}</div>
+                            <div class="sidebar-content">${category.content}</div>
+                        </div>
+                    `;
+                }
+            });
+            
+            // Add sources section
+            html += renderSources(data.categories.sources);
+            
+            document.getElementById('output').innerHTML = html;
+        }
+        
+        function analyze() {
             const stock = document.getElementById('stock').value.trim().toUpperCase();
             if (!stock) return;
             
@@ -483,6 +725,14 @@ HTML = '''
                 </div>
             `;
             
+            if (window.EventSource) {
+                analyzeStream(stock);
+            } else {
+                analyzeOnce(stock);
+            }
+        }
+        
+        async function analyzeOnce(stock) {
             try {
                 const response = await fetch('/analyze', {
                     method: 'POST',
@@ -492,178 +742,114 @@ HTML = '''
                 const data = await response.json();
                 
                 if (data.success) {
-                    const currentTime = new Date().toLocaleString();
-                    
-                    // Create newspaper-style layout
-                    let html = `
-                        <div class="main-story">
-                            <div class="article-date">${new Date().toLocaleDateString('en-US', {
-                                weekday: 'long',
-                                year: 'numeric', 
-                                month: 'long',
-                                day: 'numeric'
-                            })}</div>
-                            <h1 class="main-headline">${stock} Stock Analysis: ${data.quantitative_data ? data.quantitative_data.company_name : stock}</h1>
-                            <div class="main-byline">By Financial AI Analyst | Real-time market data analysis</div>
-                        </div>
-                    `;
-                    
-                    // Add quantitative data bar
-                    if (data.quantitative_data) {
-                        const qData = data.quantitative_data;
-                        const changeColor = qData.price_change_1d >= 0 ? '#28a745' : '#dc3545';
-                        const marketCapFormatted = typeof qData.market_cap === 'number' ? 
-                            (qData.market_cap / 1e9).toFixed(1) + 'B' : qData.market_cap;
-                        
-                        html += `
-                            <div class="stats-bar">
-                                <div class="stat-item">
-                                    <span class="stat-number" style="color: ${changeColor}">$${qData.current_price}</span>
-                                    <span class="stat-label">Current Price</span>
-                                </div>
-                                <div class="stat-item">
-                                    <span class="stat-number" style="color: ${changeColor}">${qData.price_change_1d > 0 ? '+' : ''}${qData.price_change_1d}%</span>
-                                    <span class="stat-label">1-Day Change</span>
-                                </div>
-                                <div class="stat-item">
-                                    <span class="stat-number">${qData.volatility}%</span>
-                                    <span class="stat-label">Volatility (Annual)</span>
-                                </div>
-                                <div class="stat-item">
-                                    <span class="stat-number">${marketCapFormatted}</span>
-                                    <span class="stat-label">Market Cap</span>
-                                </div>
-                                <div class="stat-item">
-                                    <span class="stat-number">${qData.pe_ratio !== 'N/A' ? qData.pe_ratio.toFixed(1) : 'N/A'}</span>
-                                    <span class="stat-label">P/E Ratio</span>
-                                </div>
-                            </div>
-                        `;
-                        
-                        // Add detailed metrics section
-                        html += `
-                            <div style="background: #f8f8f8; padding: 20px; margin: 20px 0; border: 1px solid #ddd;">
-                                <h3 style="margin-bottom: 15px; text-align: center; font-size: 18px;">Key Financial Metrics</h3>
-                                <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 15px;">
-                                    <div style="text-align: center;">
-                                        <div style="font-size: 16px; font-weight: bold;">52-Week Range</div>
-                                        <div style="color: #666;">$${qData.week_52_low} - $${qData.week_52_high}</div>
-                                        <div style="font-size: 12px; color: ${qData.pct_from_high < -10 ? '#28a745' : '#666'};">
-                                            ${qData.pct_from_high}% from high
-                                        </div>
-                                    </div>
-                                    <div style="text-align: center;">
-                                        <div style="font-size: 16px; font-weight: bold;">Beta</div>
-                                        <div style="color: #666;">${qData.beta !== 'N/A' ? qData.beta.toFixed(2) : 'N/A'}</div>
-                                        <div style="font-size: 12px; color: #999;">Market volatility</div>
-                                    </div>
-                                    <div style="text-align: center;">
-                                        <div style="font-size: 16px; font-weight: bold;">Dividend Yield</div>
-                                        <div style="color: #666;">${qData.dividend_yield.toFixed(2)}%</div>
-                                        <div style="font-size: 12px; color: #999;">Annual dividend</div>
-                                    </div>
-                                    <div style="text-align: center;">
-                                        <div style="font-size: 16px; font-weight: bold;">EPS</div>
-                                        <div style="color: #666;">${qData.eps !== 'N/A' ? '$' + qData.eps.toFixed(2) : 'N/A'}</div>
-                                        <div style="font-size: 12px; color: #999;">Earnings per share</div>
-                                    </div>
-                                    <div style="text-align: center;">
-                                        <div style="font-size: 16px; font-weight: bold;">Avg Volume</div>
-                                        <div style="color: #666;">${(qData.volume_avg / 1e6).toFixed(1)}M</div>
-                                        <div style="font-size: 12px; color: #999;">Daily trading volume</div>
-                                    </div>
-                                </div>
-                                ${qData.sector !== 'N/A' ? `
-                                    <div style="text-align: center; margin-top: 15px; padding-top: 15px; border-top: 1px solid #ddd;">
-                                        <strong>Sector:</strong> ${qData.sector} | <strong>Industry:</strong> ${qData.industry}
-                                    </div>
-                                ` : ''}
-                            </div>
-                        `;
-                    } else {
-                        // Fallback stats bar for news-only analysis
-                        if (data.total_articles && data.relevant_articles) {
-                            html += `
-                                <div class="stats-bar">
-                                    <div class="stat-item">
-                                        <span class="stat-number">${data.total_articles}</span>
-                                        <span class="stat-label">Sources Analyzed</span>
-                                    </div>
-                                    <div class="stat-item">
-                                        <span class="stat-number">${data.relevant_articles}</span>
-                                        <span class="stat-label">Key Articles</span>
-                                    </div>
-                                    <div class="stat-item">
-                                        <span class="stat-number">${Object.keys(data.categories).length - 1}</span>
-                                        <span class="stat-label">Analysis Sections</span>
-                                    </div>
-                                </div>
-                            `;
-                        }
-                    }
-                    
-                    // Create three-column newspaper layout
-                    html += '<div class="story-grid">';
-                    
-                    const categoryData = [
-                        {key: 'expert_analysis', title: 'Expert Analysis', position: 'left'},
-                        {key: 'financial_performance', title: 'Financial Performance', position: 'center'},
-                        {key: 'company_news', title: 'Company News', position: 'right'}
-                    ];
-                    
-                    categoryData.forEach((cat, index) => {
-                        if (data.categories[cat.key]) {
-                            const category = data.categories[cat.key];
-                            html += `
-                                <div class="story-column">
-                                    <div class="column-header">${category.title}</div>
-                                    <div class="story-content">${category.content}</div>
-                                </div>
-                            `;
-                        }
-                    });
-                    
-                    html += '</div>'; // Close story-grid
-                    
-                    // Add sidebar stories for remaining categories
-                    const sidebarCategories = ['market_sentiment', 'risk_assessment'];
-                    sidebarCategories.forEach(categoryKey => {
-                        if (data.categories[categoryKey]) {
-                            const category = data.categories[categoryKey];
-                            html += `
-                                <div class="sidebar-story">
-                                    <div class="sidebar-headline">${category.title}</div>
-                                    <div class="sidebar-content">${category.content}</div>
-                                </div>
-                            `;
-                        }
-                    });
-                    
-                    // Add sources section
-                    html += `
-                        <div class="sources-section">
-                            <div class="sources-title">Sources</div>
-                            <div class="sources-list">Analysis compiled from: ${data.categories.sources}</div>
-                        </div>
-                    `;
-                    
-                    document.getElementById('output').innerHTML = html;
+                    renderAnalysis(stock, data);
                 } else {
-                    document.getElementById('output').innerHTML = `
-                        <div class="error">
-                            <h3>❌ Analysis Error</h3>
-                            <p>${data.error}</p>
-                        </div>
-                    `;
+                    renderError('Analysis Error', data.error);
                 }
             } catch (error) {
+                renderError('Connection Error', error.message);
+            }
+        }
+        
+        function streamCategory(key, title) {
+            // Create the section the first time a category shows up, in its newspaper position
+            let content = document.getElementById(`category-${key}`);
+            if (content) return content;
+            
+            const gridIndex = gridCategories.findIndex(cat => cat.key === key);
+            const element = document.createElement('div');
+            if (gridIndex >= 0) {
+                element.className = 'story-column';
+                element.innerHTML = `<div class="column-header">${title}</div><div class="story-content" id="category-${key}"></div>`;
+                const grid = document.getElementById('story-grid');
+                grid.appendChild(element);
+                
+                // Keep left/center/right order regardless of arrival order
+                gridCategories.forEach(cat => {
+                    const column = document.getElementById(`category-${cat.key}`);
+                    if (column) grid.appendChild(column.parentElement);
+                });
+            } else {
+                element.className = 'sidebar-story';
+                element.innerHTML = `<div class="sidebar-headline">${title}</div><div class="sidebar-content" id="category-${key}"></div>`;
+                document.getElementById('sidebar-stories').appendChild(element);
+            }
+            return document.getElementById(`category-${key}`);
+        }
+        
+        function analyzeStream(stock) {
+            if (activeStream) activeStream.close();
+            const source = new EventSource(`/analyze/stream?symbol=${encodeURIComponent(stock)}`);
+            activeStream = source;
+            const parse = e => JSON.parse(e.data);
+            const setStatus = message => {
+                const status = document.getElementById('stream-status');
+                if (status) status.querySelector('p').textContent = message;
+            };
+            
+            source.addEventListener('start', () => {
                 document.getElementById('output').innerHTML = `
-                    <div class="error">
-                        <h3>❌ Connection Error</h3>
-                        <p>${error.message}</p>
+                    <div id="stream-header">${renderHeader(stock, null)}</div>
+                    <div id="quant-section"></div>
+                    <div class="loading" id="stream-status">
+                        <div class="spinner"></div>
+                        <p>Gathering financial intelligence from multiple sources</p>
                     </div>
+                    <div class="story-grid" id="story-grid"></div>
+                    <div id="sidebar-stories"></div>
+                    <div id="sources-section"></div>
                 `;
-            }
+            });
+            
+            source.addEventListener('quant', e => {
+                const data = parse(e);
+                if (data.quantitative_data) {
+                    document.getElementById('stream-header').innerHTML = renderHeader(stock, data.quantitative_data);
+                    document.getElementById('quant-section').innerHTML = renderQuantData(data.quantitative_data);
+                }
+            });
+            
+            source.addEventListener('articles', e => {
+                const data = parse(e);
+                setStatus(`Writing analysis from ${data.relevant_articles} of ${data.total_articles} articles...`);
+            });
+            
+            source.addEventListener('category_start', e => {
+                const data = parse(e);
+                streamCategory(data.category, data.title);
+            });
+            
+            source.addEventListener('category_delta', e => {
+                const data = parse(e);
+                streamCategory(data.category, data.category).textContent += data.delta;
+            });
+            
+            source.addEventListener('category', e => {
+                const data = parse(e);
+                streamCategory(data.category, data.title).textContent = data.content;
+            });
+            
+            source.addEventListener('done', e => {
+                const data = parse(e);
+                source.close();
+                document.getElementById('stream-status').remove();
+                document.getElementById('stream-header').innerHTML = renderHeader(stock, data.quantitative_data, data);
+                if (!data.quantitative_data) {
+                    document.getElementById('quant-section').innerHTML = renderArticleStats(data);
+                }
+                if (data.categories.sources) {
+                    document.getElementById('sources-section').innerHTML = renderSources(data.categories.sources);
+                }
+            });
+            
+            source.addEventListener('error', e => {
+                source.close();
+                if (e.data) {
+                    renderError('Analysis Error', parse(e).error);
+                } else {
+                    renderError('Connection Error', 'Lost connection to the analysis stream');
+                }
+            });
         }
         
         // Allow Enter key
@@ -679,7 +865,25 @@ HTML = '''
 
 @app.route('/')
 def home():
-    return render_template_string(HTML)
+    return render_template_string(HTML, popular_symbols=POPULAR_SYMBOLS)
+
+@app.route('/ready')
+def ready():
+    if rag_ready.is_set():
+        return jsonify({'ready': True})
+    return jsonify({'ready': False, 'error': rag_load_error}), 503
+
+@app.route('/stats')
+def stats():
+    if not rag_ready.is_set():
+        return jsonify({'ready': False}), 503
+    return jsonify(rag_system.get_stats())
+
+@app.route('/scheduler')
+def scheduler_status():
+    if watchlist_scheduler is None:
+        return jsonify({'running': False, 'ready': rag_ready.is_set()})
+    return jsonify(watchlist_scheduler.status())
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
@@ -690,15 +894,100 @@ def analyze():
         if not symbol:
             return jsonify({'success': False, 'error': 'No symbol provided'})
         
-        # Run RAG analysis
-        rag = StockRAGSystem()
-        result = rag.analyze_stock(symbol)
+        if rag_load_error or not rag_ready.wait(timeout=RAG_STARTUP_TIMEOUT):
+            return jsonify({'success': False, 'error': 'Analysis engine is still loading, please try again shortly'}), 503
+        
+        # Run RAG analysis on the shared, warm instance
+        result = rag_system.analyze_stock(symbol, analysis_mode=data.get('mode'))
         
         return jsonify(result)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+MAX_BATCH_SYMBOLS = int(os.getenv('MAX_BATCH_SYMBOLS', '50'))
+
+@app.route('/analyze_batch', methods=['POST'])
+def analyze_batch():
+    try:
+        data = request.get_json() or {}
+        symbols = [symbol.strip() for symbol in data.get('symbols', []) if symbol.strip()]
+        
+        if not symbols:
+            return jsonify({'success': False, 'error': 'No symbols provided'}), 400
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BATCH_SYMBOLS} symbols per batch'}), 400
+        
+        if rag_load_error or not rag_ready.wait(timeout=RAG_STARTUP_TIMEOUT):
+            return jsonify({'success': False, 'error': 'Analysis engine is still loading, please try again shortly'}), 503
+        
+        results = rag_system.analyze_batch(symbols, analysis_mode=data.get('mode'))
+        return jsonify({'success': True, 'results': results})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/screen', methods=['POST'])
+def screen_universe():
+    try:
+        data = request.get_json() or {}
+        symbols = [symbol.strip() for symbol in data.get('symbols', []) if symbol.strip()]
+        
+        if not symbols:
+            return jsonify({'success': False, 'error': 'No symbols provided'}), 400
+        
+        if rag_load_error or not rag_ready.wait(timeout=RAG_STARTUP_TIMEOUT):
+            return jsonify({'success': False, 'error': 'Analysis engine is still loading, please try again shortly'}), 503
+        
+        results = rag_system.screen_universe(
+            symbols,
+            sort_by=data.get('sort_by', 'pct_from_high'),
+            descending=bool(data.get('descending', False)),
+            filters=data.get('filters'),
+            limit=data.get('limit')
+        )
+        return jsonify({'success': True, 'count': len(results), 'results': results})
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+def format_sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/analyze/stream')
+def analyze_stream():
+    symbol = request.args.get('symbol', '').strip()
+    mode = request.args.get('mode')
+    
+    def events():
+        if not symbol:
+            yield format_sse('error', {'error': 'No symbol provided'})
+            return
+        
+        # Let the browser render a shell immediately, even while the model is loading
+        yield format_sse('start', {'symbol': symbol})
+        
+        if rag_load_error or not rag_ready.wait(timeout=RAG_STARTUP_TIMEOUT):
+            yield format_sse('error', {'error': 'Analysis engine is still loading, please try again shortly'})
+            return
+        
+        try:
+            for event, data in rag_system.analyze_stock_stream(symbol, analysis_mode=mode):
+                if event != 'start':
+                    yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse('error', {'error': str(e)})
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 if __name__ == '__main__':
     print("🚀 Starting Stock RAG Server...")
     print("📍 Open: http://127.0.0.1:7777")
@@ -0,0 +1,137 @@
+"""Benchmark the one-pass HTML extractor against the original scraper parsing.
+
+Usage:
+    python bench_parsing.py saved_pages/ --symbol AAPL
+    python bench_parsing.py              # synthetic deeply nested pages
+
+Saved pages are listing pages named after their source, e.g.
+yahoo-aapl.html, marketwatch-1.html or seeking_alpha-news.html. The legacy
+path is html.parser plus per-selector soup.select() and a get_text() call for
+every div/section/article; results of both paths are compared as well.
+"""
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List
+
+from bs4 import BeautifulSoup
+
+from html_parsing import HTML_PARSER, SOURCE_SPECS, extract_listing
+
+
+def legacy_extract_listing(content, spec: Dict, symbol: str) -> Dict:
+    """The scrapers' original parsing: html.parser, one select() per selector, get_text() per section"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    links = []
+    seen_urls = set()
+    for selector in spec['selectors']:
+        for link in soup.select(selector)[:3]:
+            title = link.get_text().strip()
+            href = link.get('href', '')
+            if len(title) > spec['min_title_length'] and href:
+                url = href if href.startswith('http') else f"{spec['base_url']}{href}"
+                if url not in seen_urls:
+                    seen_urls.add(url)
+                    links.append({'title': title, 'url': url})
+
+    paragraph = None
+    if symbol in soup.get_text():
+        if spec['paragraph_scope'] == 'page':
+            candidates = [soup]
+        else:
+            candidates = []
+            for section in soup.find_all(['div', 'section', 'article']):
+                section_text = section.get_text()
+                if symbol not in section_text or len(section_text) <= spec.get('section_min_length', 0):
+                    continue
+                keywords = spec.get('section_keywords')
+                if keywords and not any(word in section_text.lower() for word in keywords):
+                    continue
+                candidates = [section]
+                break
+        for scope in candidates:
+            for p in scope.find_all('p'):
+                text = p.get_text().strip()
+                if len(text) > spec['paragraph_min_length'] and symbol in text:
+                    paragraph = text
+                    break
+
+    return {'links': links, 'paragraph': paragraph}
+
+
+def synthetic_page(symbol: str, blocks: int = 60, depth: int = 25) -> bytes:
+    """A listing page of many deeply nested blocks; only the last block mentions the symbol"""
+    parts = ['<html><head><script>var config = {};</script></head><body>']
+    for block in range(blocks):
+        mentions = block == blocks - 1
+        parts.append('<div class="wrapper">' * depth)
+        for item in range(5):
+            parts.append(
+                f'<div class="news-item"><h3 class="title"><a href="/news/story-{block}-{item}.html">'
+                f'Markets update {block}-{item}: stocks move on earnings and rate outlook</a></h3>'
+                f'<p>Filler paragraph {block}-{item} with enough words to look like real article text on a page.</p></div>'
+            )
+        if mentions:
+            parts.append(f'<section><p>{symbol} investment analysis: the outlook for {symbol} depends on margins, '
+                         f'guidance and the next earnings report.</p></section>')
+        parts.append('</div>' * depth)
+    parts.append('</body></html>')
+    return ''.join(parts).encode()
+
+
+def load_pages(pages_dir: str, symbol: str) -> List[tuple]:
+    """(name, source key, content) for every saved page whose name starts with a known source"""
+    if not pages_dir:
+        page = synthetic_page(symbol)
+        return [(f'synthetic-{source}', source, page) for source in SOURCE_SPECS]
+
+    pages = []
+    for name in sorted(os.listdir(pages_dir)):
+        source = next((key for key in sorted(SOURCE_SPECS, key=len, reverse=True) if name.startswith(key)), None)
+        if source and name.endswith(('.html', '.htm')):
+            with open(os.path.join(pages_dir, name), 'rb') as f:
+                pages.append((name, source, f.read()))
+    return pages
+
+
+def best_time(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare legacy and one-pass HTML extraction on saved listing pages')
+    parser.add_argument('pages_dir', nargs='?', help='directory of saved pages named <source>-*.html (default: synthetic pages)')
+    parser.add_argument('--symbol', default='AAPL', help='ticker the pages are about')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per page; the best time is reported')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir, args.symbol)
+    if not pages:
+        print(f"No pages named {'/'.join(SOURCE_SPECS)}-*.html in {args.pages_dir}")
+        sys.exit(1)
+
+    print(f"Parser backend: {HTML_PARSER}")
+    print(f"{'page':40} {'KB':>7} {'legacy ms':>10} {'one-pass ms':>12} {'speedup':>8}  same")
+    total_legacy = total_fast = 0.0
+    for name, source, content in pages:
+        spec = SOURCE_SPECS[source]
+        legacy = best_time(lambda: legacy_extract_listing(content, spec, args.symbol), args.repeat)
+        fast = best_time(lambda: extract_listing(content, spec, args.symbol), args.repeat)
+        # Compare on the same backend; lxml and html.parser can build different trees from broken markup
+        same = legacy_extract_listing(content, spec, args.symbol) == extract_listing(content, spec, args.symbol, parser='html.parser')
+        total_legacy += legacy
+        total_fast += fast
+        print(f"{name[:40]:40} {len(content) / 1024:7.1f} {legacy * 1000:10.1f} {fast * 1000:12.1f} {legacy / fast:7.1f}x  {'yes' if same else 'NO'}")
+
+    print(f"{'total':40} {'':7} {total_legacy * 1000:10.1f} {total_fast * 1000:12.1f} {total_legacy / total_fast:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Resumable bulk analysis of a ticker list.
+
+Usage:
+    python bulk_analyze.py tickers.txt --output-dir bulk_results --workers 4
+
+Each worker process loads the embedding model once and analyzes symbols from
+the list. Results are appended to JSONL shards and every finished symbol is
+recorded in a checkpoint file, so re-running the same command after a crash
+skips everything already done.
+"""
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+CHECKPOINT_FILE = 'checkpoint.tsv'
+
+_rag_system = None
+
+
+def _init_worker(workers: int):
+    """Load the RAG system once per worker process"""
+    global _rag_system
+    load_dotenv()
+    # The embedding cache locks its files across processes where flock is
+    # available. The headline index is a single unlocked log per cache dir and
+    # is not safe to share; per-symbol stores are, since each symbol is
+    # handled by a single worker.
+    from embedding_cache import SHAREABLE
+    if not SHAREABLE:
+        os.environ['EMBEDDING_CACHE'] = '0'
+    os.environ['HEADLINE_INDEX'] = '0'
+    # Workers already run in parallel processes; parse pages inline
+    os.environ['PARSE_WORKERS'] = '0'
+    # Bulk runs want freshly computed results, not cached or stale ones
+    os.environ['RESULT_CACHE'] = '0'
+    from rag_system import StockRAGSystem
+    _rag_system = StockRAGSystem()
+    # Each worker has its own rate limiter; split the per-host politeness rates between them
+    _rag_system.rate_limiter.split(workers)
+    _rag_system.warm_up()
+
+
+def _analyze(symbol: str, analysis_mode: str = None) -> tuple:
+    try:
+        result = _rag_system.analyze_stock(symbol, analysis_mode=analysis_mode)
+    except Exception as e:
+        result = {'success': False, 'error': str(e)}
+    return symbol, result
+
+
+def read_symbols(path: str) -> List[str]:
+    """Read one ticker per line, skipping blanks and # comments"""
+    with open(path) as f:
+        symbols = [line.split('#')[0].strip().upper() for line in f]
+    return list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+
+def load_checkpoint(path: str, retry_failed: bool = False) -> Dict[str, str]:
+    """Symbols already processed, mapped to 'ok' or 'error'"""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 2:
+                    done[parts[0]] = parts[1]
+    if retry_failed:
+        done = {symbol: status for symbol, status in done.items() if status == 'ok'}
+    return done
+
+
+class ShardWriter:
+    """Writes results to numbered JSONL shards and checkpoints each symbol after it is durable
+
+    A resumed run always starts a new shard, so a partially written line from a
+    crash never gets appended to.
+    """
+
+    def __init__(self, output_dir: str, shard_size: int = 500):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        os.makedirs(output_dir, exist_ok=True)
+
+        existing = [name for name in os.listdir(output_dir) if name.startswith('shard-') and name.endswith('.jsonl')]
+        self.shard_index = max((int(name[6:11]) for name in existing), default=-1) + 1
+        self.records_in_shard = 0
+        self.shard = None
+        self.checkpoint = open(os.path.join(output_dir, CHECKPOINT_FILE), 'a')
+
+    def _rotate(self):
+        if self.shard:
+            self.shard.close()
+        self.shard = open(os.path.join(self.output_dir, f"shard-{self.shard_index:05d}.jsonl"), 'a')
+        self.shard_index += 1
+        self.records_in_shard = 0
+
+    def write(self, symbol: str, result: Dict):
+        if self.shard is None or self.records_in_shard >= self.shard_size:
+            self._rotate()
+        record = {'symbol': symbol, 'analyzed_at': datetime.now().isoformat(), 'result': result}
+        self.shard.write(json.dumps(record) + '\n')
+        self.shard.flush()
+        os.fsync(self.shard.fileno())
+        self.records_in_shard += 1
+
+        self.checkpoint.write(f"{symbol}\t{'ok' if result.get('success') else 'error'}\n")
+        self.checkpoint.flush()
+
+    def close(self):
+        if self.shard:
+            self.shard.close()
+        self.checkpoint.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run analyze_stock over a ticker list with a process pool')
+    parser.add_argument('tickers', help='file with one ticker symbol per line')
+    parser.add_argument('--output-dir', default='bulk_results', help='directory for JSONL shards and the checkpoint')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='worker processes')
+    parser.add_argument('--shard-size', type=int, default=500, help='results per JSONL shard')
+    parser.add_argument('--mode', choices=['per_category', 'single'], help='analysis mode (default: ANALYSIS_MODE)')
+    parser.add_argument('--retry-failed', action='store_true', help='re-run symbols whose previous analysis failed')
+    args = parser.parse_args()
+
+    symbols = read_symbols(args.tickers)
+    done = load_checkpoint(os.path.join(args.output_dir, CHECKPOINT_FILE), retry_failed=args.retry_failed)
+    pending = [symbol for symbol in symbols if symbol not in done]
+    print(f"📋 {len(symbols)} symbols, {len(symbols) - len(pending)} already done, {len(pending)} to analyze")
+    if not pending:
+        return
+
+    writer = ShardWriter(args.output_dir, shard_size=args.shard_size)
+    failures = 0
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.workers,)) as executor:
+            futures = [executor.submit(_analyze, symbol, args.mode) for symbol in pending]
+            for completed, future in enumerate(as_completed(futures), start=1):
+                symbol, result = future.result()
+                writer.write(symbol, result)
+                if not result.get('success'):
+                    failures += 1
+                print(f"[{completed}/{len(pending)}] {symbol}: {'ok' if result.get('success') else result.get('error')}")
+    finally:
+        writer.close()
+
+    print(f"✅ Finished: {len(pending) - failures} succeeded, {failures} failed")
+
+
+if __name__ == '__main__':
+    main()
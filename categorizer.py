@@ -0,0 +1,181 @@
+import re
+import json
+import threading
+from typing import Callable, Dict, List
+
+import numpy as np
+
+DEFAULT_CATEGORY = 'company_news'
+
+# Ties go to the category listed first
+DEFAULT_CATEGORY_KEYWORDS = {
+    'expert_analysis': ['analysis', 'recommendation', 'outlook', 'investment', 'target price', 'rating', 'upgrade', 'downgrade', 'analyst', 'forecast'],
+    'company_news': ['announced', 'launch', 'partnership', 'acquisition', 'merger', 'ceo', 'executive', 'product', 'service', 'expansion'],
+    'financial_performance': ['earnings', 'revenue', 'profit', 'loss', 'eps', 'quarterly', 'financial results', 'sales', 'income', 'margin'],
+    'market_sentiment': ['bullish', 'bearish', 'optimistic', 'pessimistic', 'confidence', 'sentiment', 'mood', 'outlook', 'expectations'],
+    'risk_assessment': ['risk', 'concern', 'challenge', 'threat', 'volatility', 'uncertainty', 'decline', 'drop', 'fall', 'warning']
+}
+
+# Seed sentences for the embedding prototypes, alongside each category's keywords
+CATEGORY_DESCRIPTIONS = {
+    'expert_analysis': 'Analyst ratings, price targets, upgrades and downgrades, investment recommendations and forecasts for the stock.',
+    'company_news': 'Company announcements: product launches, partnerships, acquisitions, mergers, executive changes and expansion plans.',
+    'financial_performance': 'Quarterly earnings, revenue, profit, EPS, margins, sales and financial results compared with estimates.',
+    'market_sentiment': 'Investor sentiment and market mood: bullish or bearish views, confidence, optimism, pessimism and expectations.',
+    'risk_assessment': 'Risks facing the company: concerns, challenges, threats, volatility, uncertainty, declines and warnings.'
+}
+
+
+def load_category_keywords(path: str = None) -> Dict[str, List[str]]:
+    """Default keyword taxonomy, with categories overridden by a JSON file of {category: [keywords]}"""
+    keywords = {category: list(words) for category, words in DEFAULT_CATEGORY_KEYWORDS.items()}
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        for category, words in overrides.items():
+            if category not in keywords:
+                raise ValueError(f"Unknown category '{category}' in {path}. Use one of: {', '.join(keywords)}")
+            keywords[category] = [word.lower() for word in words if word]
+    return keywords
+
+
+class KeywordCategorizer:
+    """Assigns documents to the category whose keywords they mention most.
+
+    Scores equal counting `keyword in text` for every keyword, but the text is
+    split into whitespace-separated tokens once instead of being scanned per
+    keyword. A keyword without whitespace can only occur inside a single
+    token, so the keywords contained in each distinct token are found once
+    with one compiled regex (longest keywords first, resuming one character
+    after each match, plus an implied-substring map for keywords nested in a
+    match) and cached. Multi-word keywords are checked against the full text.
+    """
+
+    TOKEN_CACHE_SIZE = 100000
+
+    def __init__(self, category_keywords: Dict[str, List[str]] = None, default_category: str = DEFAULT_CATEGORY):
+        self.category_keywords = category_keywords or DEFAULT_CATEGORY_KEYWORDS
+        self.categories = list(self.category_keywords)
+        self.default_category = default_category
+
+        keywords = sorted({word.lower() for words in self.category_keywords.values() for word in words if word}, key=len, reverse=True)
+        words = [word for word in keywords if len(word.split()) == 1 and word == word.strip()]
+        self._phrases = [word for word in keywords if word not in words]
+        self._pattern = re.compile('|'.join(re.escape(word) for word in words)) if words else None
+        # Every keyword contained in a matched keyword is present too
+        self._implied = {word: frozenset(other for other in words if other in word) for word in words}
+        # Category index per listing of the keyword (a keyword may be listed under several)
+        self._categories_of = {word: [] for word in keywords}
+        for i, category in enumerate(self.categories):
+            for word in self.category_keywords[category]:
+                if word:
+                    self._categories_of[word.lower()].append(i)
+        # Tokens already scanned, and the keywords of those that contain any.
+        # Categorizers are shared between request threads, so updates hold the lock.
+        self._token_lock = threading.Lock()
+        self._seen_tokens = set()
+        self._keyword_tokens = {}
+        self._keyword_token_set = set()
+
+    def _scan_token(self, token: str) -> frozenset:
+        found = set()
+        match = self._pattern.search(token) if self._pattern else None
+        while match:
+            found |= self._implied[match.group()]
+            # Resume one character later so overlapping keywords are found too
+            match = self._pattern.search(token, match.start() + 1)
+        return frozenset(found)
+
+    def scores(self, text: str) -> List[int]:
+        """Number of distinct keywords of each category found in the text, in category order"""
+        text = text.lower()
+        tokens = set(text.split())
+
+        present = set()
+        with self._token_lock:
+            unseen = tokens - self._seen_tokens
+            for token in tokens & self._keyword_token_set:
+                present |= self._keyword_tokens[token]
+        # Scan new tokens outside the lock
+        scanned = {token: self._scan_token(token) for token in unseen}
+        for found in scanned.values():
+            present |= found
+        with self._token_lock:
+            for token, found in scanned.items():
+                if len(self._seen_tokens) >= self.TOKEN_CACHE_SIZE:
+                    break
+                # Record keyword tokens before marking them seen
+                if found:
+                    self._keyword_tokens[token] = found
+                    self._keyword_token_set.add(token)
+                self._seen_tokens.add(token)
+        present.update(phrase for phrase in self._phrases if phrase in text)
+
+        scores = [0] * len(self.categories)
+        for word in present:
+            for i in self._categories_of[word]:
+                scores[i] += 1
+        return scores
+
+    def classify(self, text: str) -> str:
+        """Highest-scoring category, or the default when no keyword matches"""
+        scores = self.scores(text)
+        best = max(range(len(scores)), key=scores.__getitem__, default=None)
+        return self.categories[best] if best is not None and scores[best] > 0 else self.default_category
+
+    def categorize(self, documents: List[Dict], embeddings: np.ndarray = None) -> Dict[str, List[Dict]]:
+        """Group a batch of documents by category (title and content are scored together; embeddings are unused)"""
+        categories = {category: [] for category in self.categories}
+        categories.setdefault(self.default_category, [])
+        for doc in documents:
+            categories[self.classify(f"{doc['title']} {doc['content']}")].append(doc)
+        return categories
+
+
+class EmbeddingCategorizer:
+    """Assigns documents to the category with the most similar prototype embedding.
+
+    Each prototype is the normalized mean embedding of the category's
+    description and keywords, encoded once. Documents are classified with a
+    single matrix multiply against their existing normalized vectors, so
+    categorizing retrieved documents costs no extra encoding.
+    """
+
+    def __init__(self, encode_fn: Callable, category_keywords: Dict[str, List[str]] = None, descriptions: Dict[str, str] = None):
+        self.encode_fn = encode_fn
+        category_keywords = category_keywords or DEFAULT_CATEGORY_KEYWORDS
+        descriptions = descriptions or CATEGORY_DESCRIPTIONS
+        self.categories = list(category_keywords)
+
+        seeds = [[descriptions[category]] if category in descriptions else [] for category in self.categories]
+        for texts, category in zip(seeds, self.categories):
+            texts.extend(category_keywords[category])
+        vectors = self._normalize(np.asarray(encode_fn([text for texts in seeds for text in texts]), dtype='float32'))
+
+        prototypes = []
+        start = 0
+        for texts in seeds:
+            prototypes.append(vectors[start:start + len(texts)].mean(axis=0))
+            start += len(texts)
+        self.prototypes = self._normalize(np.vstack(prototypes))
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def categorize(self, documents: List[Dict], embeddings: np.ndarray = None) -> Dict[str, List[Dict]]:
+        """Group a batch of documents by category, given their normalized embeddings in the same order
+
+        Documents are encoded only when no embeddings are passed.
+        """
+        categories = {category: [] for category in self.categories}
+        if not documents:
+            return categories
+        if embeddings is None:
+            embeddings = self._normalize(np.asarray(self.encode_fn([f"{doc['title']} {doc['content']}" for doc in documents]), dtype='float32'))
+
+        assignments = np.argmax(embeddings @ self.prototypes.T, axis=1)
+        for doc, category in zip(documents, assignments):
+            categories[self.categories[category]].append(doc)
+        return categories
@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import itertools
+import time
+import zlib
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+from symbol_index import document_id
+
+_PRIME = (1 << 31) - 1
+
+
+def title_tokens(title: str) -> frozenset:
+    """Lowercased alphanumeric words of a headline"""
+    return frozenset(re.sub(r'[^a-zA-Z0-9\s]', '', title.lower()).split())
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+
+class MinHashLSH:
+    """MinHash signatures banded into LSH buckets for near-duplicate lookups.
+
+    Candidates that share a band bucket are verified with exact Jaccard, so
+    lookups give the same decision as comparing against every stored title
+    except for the rare pair above the threshold that never shares a bucket.
+    With 32 bands of 4 rows that happens for under 0.1% of pairs at Jaccard
+    0.7 and practically never for closer matches.
+    """
+
+    def __init__(self, threshold: float = 0.7, bands: int = 32, rows: int = 4, seed: int = 1):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, _PRIME, size=(bands * rows, 1), dtype=np.uint64)
+        self._b = generator.integers(0, _PRIME, size=(bands * rows, 1), dtype=np.uint64)
+
+        self._buckets = [{} for _ in range(bands)]
+        self._tokens = {}  # key -> token set
+        self._order = {}  # key -> insertion order, to return the earliest match
+        self._counter = itertools.count()  # never reuses an order after remove()
+
+    def signature(self, tokens: frozenset) -> np.ndarray:
+        if not tokens:
+            # Every empty title gets the same signature, so they collide with each other
+            return np.full(self.bands * self.rows, _PRIME, dtype=np.uint64)
+        hashes = np.array([zlib.crc32(token.encode('utf-8')) for token in tokens], dtype=np.uint64)
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def query(self, tokens: frozenset, signature: np.ndarray = None):
+        """Key of the earliest stored entry with Jaccard above the threshold, or None"""
+        if signature is None:
+            signature = self.signature(tokens)
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            if jaccard(tokens, self._tokens[key]) > self.threshold and (best is None or self._order[key] < self._order[best]):
+                best = key
+        return best
+
+    def insert(self, key, tokens: frozenset, signature: np.ndarray = None):
+        if signature is None:
+            signature = self.signature(tokens)
+        self._tokens[key] = tokens
+        self._order[key] = next(self._counter)
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, []).append(key)
+
+    def remove(self, key):
+        tokens = self._tokens.pop(key)
+        del self._order[key]
+        for buckets, band_key in zip(self._buckets, self._band_keys(self.signature(tokens))):
+            bucket = buckets[band_key]
+            bucket.remove(key)
+            if not bucket:
+                del buckets[band_key]
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+
+def remove_near_duplicates(articles: List[Dict], threshold: float = 0.7) -> List[Dict]:
+    """Keep each article unless its title is more than threshold Jaccard-similar to an earlier kept one"""
+    index = MinHashLSH(threshold)
+    unique_articles = []
+    for position, article in enumerate(articles):
+        tokens = title_tokens(article['title'])
+        signature = index.signature(tokens)
+        if index.query(tokens, signature) is None:
+            index.insert(position, tokens, signature)
+            unique_articles.append(article)
+    return unique_articles
+
+
+class HeadlineIndex:
+    """Persistent near-duplicate index mapping headlines to the first article seen with them.
+
+    A headline that near-duplicates one already seen at another URL (a
+    syndicated copy, or yesterday's story re-published) takes the stored
+    article's title and URL, so it keeps the same document id and is not added
+    to the symbol indexes and prompts a second time. Its content stays the
+    freshly fetched one (templated daily headlines can match last week's
+    story) and replaces the stored body, so the symbol index re-embeds it.
+    Articles are kept in an append-only JSONL log; entries not seen for
+    max_age_seconds are dropped on load and, in a long-running process, at
+    most every EXPIRE_INTERVAL seconds, compacting the log each time.
+    """
+
+    TOUCH_INTERVAL = 24 * 3600
+    EXPIRE_INTERVAL = 3600
+
+    def __init__(self, index_dir: str, max_age_seconds: float = 30 * 24 * 3600, threshold: float = 0.7):
+        self.path = os.path.join(index_dir, 'headlines.jsonl')
+        self.max_age_seconds = max_age_seconds
+        self.lsh = MinHashLSH(threshold)
+        self.canonicalized = 0
+        os.makedirs(index_dir, exist_ok=True)
+
+        self._articles = {}  # document id -> stored article with 'seen'
+        self._lock = threading.Lock()
+        self._last_expiry = time.time()
+        self._load()
+
+    def _load(self):
+        entries = {}
+        needs_compaction = False
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write at the end of the log
+                        needs_compaction = True
+                        continue
+                    if 'title' in entry:
+                        entries.setdefault(entry['id'], entry)
+                    elif entry['id'] in entries:
+                        # A later sighting: newer 'seen', and 'content' if the body changed
+                        entries[entry['id']].update(entry)
+                        needs_compaction = True
+
+        cutoff = time.time() - self.max_age_seconds
+        for doc_id, entry in entries.items():
+            if entry['seen'] < cutoff:
+                needs_compaction = True
+                continue
+            self._articles[doc_id] = entry
+            self.lsh.insert(doc_id, title_tokens(entry['title']))
+
+        if needs_compaction:
+            self._compact()
+
+    def _compact(self):
+        with open(f"{self.path}.tmp", 'w') as f:
+            for entry in self._articles.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def _expire_locked(self, now: float):
+        """Drop entries not seen for max_age_seconds from memory and the log"""
+        self._last_expiry = now
+        cutoff = now - self.max_age_seconds
+        expired = [doc_id for doc_id, entry in self._articles.items() if entry['seen'] < cutoff]
+        for doc_id in expired:
+            del self._articles[doc_id]
+            self.lsh.remove(doc_id)
+        if expired:
+            self._compact()
+
+    def canonicalize(self, articles: List[Dict]) -> List[Dict]:
+        """Replace near-duplicates of known headlines with the stored article and record new ones"""
+        now = time.time()
+        results = []
+        seen_ids = set()
+        log = []
+        with self._lock:
+            if now - self._last_expiry >= self.EXPIRE_INTERVAL:
+                self._expire_locked(now)
+            for article in articles:
+                tokens = title_tokens(article['title'])
+                signature = self.lsh.signature(tokens)
+                doc_id = self.lsh.query(tokens, signature)
+
+                if doc_id is None:
+                    doc_id = document_id(article)
+                    entry = {'id': doc_id, 'title': article['title'], 'url': article.get('url', ''),
+                             'content': article['content'], 'source': article['source'], 'seen': now}
+                    self._articles[doc_id] = entry
+                    self.lsh.insert(doc_id, tokens, signature)
+                    log.append(entry)
+                else:
+                    entry = self._articles[doc_id]
+                    if entry.get('url') != article.get('url'):
+                        # Same story under another URL: keep the stored id, but the fresh body
+                        article = dict(article, title=entry['title'], url=entry['url'], source=entry['source'])
+                        self.canonicalized += 1
+                    if article['content'] != entry['content']:
+                        entry['content'] = article['content']
+                        entry['seen'] = now
+                        log.append({'id': doc_id, 'content': article['content'], 'seen': now})
+                    elif now - entry['seen'] > self.TOUCH_INTERVAL:
+                        entry['seen'] = now
+                        log.append({'id': doc_id, 'seen': now})
+
+                if doc_id not in seen_ids:
+                    seen_ids.add(doc_id)
+                    results.append(article)
+
+            if log:
+                with open(self.path, 'a') as f:
+                    f.write(''.join(json.dumps(entry) + '\n' for entry in log))
+        return results
+
+    def stats(self) -> Dict:
+        return {'headlines': len(self.lsh), 'canonicalized': self.canonicalized}
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from storage import write_json_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+# Whether several processes may share one cache directory
+SHAREABLE = fcntl is not None
+
+
+class EmbeddingCache:
+    """Disk-backed, content-addressed cache of float32 embeddings.
+
+    Vectors live in a fixed-size memory-mapped matrix; a key -> slot map kept in
+    LRU order decides which slot is recycled once the cache is full. Keys hash
+    the model name together with the text, so switching models never returns
+    stale vectors.
+
+    The key owning each slot is recorded next to the vector: writes clear it,
+    store the vector, then set it, and reads only trust a slot whose recorded
+    key matches. The JSON index is only flushed periodically, so after a crash,
+    or when another process sharing the files has recycled a slot, a stale
+    mapping becomes a miss instead of returning someone else's vector. Slot
+    writes and reads hold an exclusive/shared file lock across processes.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dimension: int, capacity: int = 50000, flush_interval: float = 30.0):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(cache_dir, 'embeddings.f32')
+        self.index_path = os.path.join(cache_dir, 'embeddings.json')
+        self.keys_path = os.path.join(cache_dir, 'embeddings.keys')
+        self._lock_file = open(os.path.join(cache_dir, 'embeddings.lock'), 'a')
+
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()  # key -> slot, least recently used first
+        self._free = []  # unused slots, handed out before recycling
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        with self._file_lock(exclusive=True):
+            self._load()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _owned(self, key: str, slot: int) -> bool:
+        """Whether the slot still holds the vector written for key"""
+        return self._slot_keys[slot].tobytes() == bytes.fromhex(key)
+
+    def _load(self):
+        meta = None
+        if os.path.exists(self.index_path) and os.path.exists(self.vectors_path):
+            try:
+                with open(self.index_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading embedding cache index: {e}")
+
+        compatible = (
+            meta is not None
+            and meta.get('dimension') == self.dimension
+            and meta.get('capacity') == self.capacity
+            and os.path.getsize(self.vectors_path) == self.capacity * self.dimension * 4
+            and os.path.exists(self.keys_path)
+            and os.path.getsize(self.keys_path) == self.capacity * 32
+        )
+        mode = 'r+' if compatible else 'w+'
+        self._vectors = np.memmap(self.vectors_path, dtype='float32', mode=mode, shape=(self.capacity, self.dimension))
+        self._slot_keys = np.memmap(self.keys_path, dtype='uint8', mode=mode, shape=(self.capacity, 32))
+        if compatible:
+            # Drop mappings whose slot was rewritten after the index was last flushed
+            self._slots = OrderedDict((key, slot) for key, slot in meta['slots'] if self._owned(key, slot))
+        used = set(self._slots.values())
+        self._free = [slot for slot in range(self.capacity - 1, -1, -1) if slot not in used]
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode('utf-8')).hexdigest()
+
+    def _store(self, key: str, vector: np.ndarray):
+        if key in self._slots:
+            slot = self._slots[key]
+            self._slots.move_to_end(key)
+        elif self._free:
+            slot = self._free.pop()
+            self._slots[key] = slot
+        else:
+            # Recycle the least recently used slot
+            _, slot = self._slots.popitem(last=False)
+            self._slots[key] = slot
+        # Tombstone the slot while its vector is rewritten
+        self._slot_keys[slot] = 0
+        self._vectors[slot] = vector
+        self._slot_keys[slot] = np.frombuffer(bytes.fromhex(key), dtype='uint8')
+        self._dirty = True
+
+    def encode(self, texts: List[str], encode_fn: Callable) -> np.ndarray:
+        """Return embeddings for texts, encoding only the ones not already cached"""
+        keys = [self.key(text) for text in texts]
+        result = np.empty((len(texts), self.dimension), dtype='float32')
+
+        missing = {}
+        with self._lock, self._file_lock(exclusive=False):
+            for i, key in enumerate(keys):
+                slot = self._slots.get(key)
+                if slot is not None and not self._owned(key, slot):
+                    # Recycled by another process sharing the cache files; ours to reuse too
+                    del self._slots[key]
+                    self._free.append(slot)
+                    slot = None
+                if slot is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._slots.move_to_end(key)
+                    result[i] = self._vectors[slot]
+            self.hits += len(texts) - sum(len(positions) for positions in missing.values())
+            self.misses += sum(len(positions) for positions in missing.values())
+
+        if missing:
+            # Encode each unseen text once, outside the lock
+            missing_keys = list(missing)
+            embeddings = np.asarray(encode_fn([texts[missing[key][0]] for key in missing_keys]), dtype='float32')
+            with self._lock, self._file_lock(exclusive=True):
+                for key, vector in zip(missing_keys, embeddings):
+                    self._store(key, vector)
+                    for i in missing[key]:
+                        result[i] = vector
+                if time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+        return result
+
+    def _flush_locked(self):
+        if not self._dirty:
+            return
+        self._vectors.flush()
+        self._slot_keys.flush()
+        write_json_atomic(self.index_path, {
+            'model': self.model_name,
+            'dimension': self.dimension,
+            'capacity': self.capacity,
+            'slots': list(self._slots.items())
+        })
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Persist vectors and the slot index to disk"""
+        with self._lock:
+            self._flush_locked()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._slots),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,334 @@
+import os
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List
+
+import soupsieve
+from bs4 import BeautifulSoup, CData, NavigableString
+
+# Same string types Tag.get_text() includes; scripts, styles and comments are skipped
+TEXT_TYPES = (NavigableString, CData)
+SECTION_TAGS = frozenset(('div', 'section', 'article'))
+
+SOURCE_SPECS = {
+    'yahoo': {
+        'source': 'Yahoo Finance',
+        'base_url': 'https://finance.yahoo.com',
+        'selectors': [
+            '[data-testid="story-title"] a',
+            'h3[class*="title"] a',
+            'a[data-testid="story-title"]',
+            'a[class*="storylink"]',
+            'h3 a[href*="/news/"]',
+            'div[class*="news"] h3 a',
+            'li[class*="news"] a'
+        ],
+        'min_title_length': 20,
+        # Any paragraph on the page mentioning the symbol
+        'paragraph_scope': 'page',
+        'paragraph_min_length': 50
+    },
+    'marketwatch': {
+        'source': 'MarketWatch',
+        'base_url': 'https://www.marketwatch.com',
+        'selectors': [
+            'h3.article__headline a',
+            'h2.article__headline a',
+            'a[class*="headline"]',
+            'div[class*="article"] h3 a',
+            'div[class*="news"] a',
+            'a[href*="/story/"]',
+            'h3 a[href*="marketwatch.com"]'
+        ],
+        'min_title_length': 25,
+        # A paragraph inside the first div/section/article that mentions the symbol
+        'paragraph_scope': 'section',
+        'section_min_length': 100,
+        'paragraph_min_length': 50
+    },
+    'seeking_alpha': {
+        'source': 'Seeking Alpha',
+        'base_url': 'https://seekingalpha.com',
+        'selectors': [
+            'a[data-test-id*="post-list"]',
+            'article h2 a',
+            'h3 a[href*="/article/"]',
+            'div[class*="article"] a',
+            'a[href*="/news/"]',
+            'h2 a[href*="seekingalpha.com"]',
+            'div[class*="title"] a'
+        ],
+        'min_title_length': 20,
+        'paragraph_scope': 'section',
+        'section_keywords': ['analysis', 'outlook', 'investment', 'recommendation'],
+        'paragraph_min_length': 80
+    }
+}
+
+ARTICLE_SPEC = {
+    'skip_tags': ['script', 'style', 'nav', 'header', 'footer', 'aside'],
+    'content_selectors': [
+        'div[class*="content"] p',
+        'div[class*="body"] p',
+        'article p',
+        'div[class*="text"] p',
+        '.content p',
+        '.article-body p'
+    ],
+    'paragraphs': 3,
+    'max_length': 500
+}
+
+
+def _default_parser() -> str:
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+HTML_PARSER = os.getenv('HTML_PARSER') or _default_parser()
+
+
+def parse_html(content, parser: str = None) -> BeautifulSoup:
+    """Parse a page with the configured backend (lxml when installed, else html.parser)"""
+    return BeautifulSoup(content, parser or HTML_PARSER)
+
+
+_COMPOUND = re.compile(r'(?P<tag>[A-Za-z][\w-]*|\*)?(?P<rest>(?:\.[\w-]+|\[[^\]]+\])*)$')
+_PART = re.compile(r'\.(?P<cls>[\w-]+)|\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^$~]?=)\s*(?:"(?P<dq>[^"]*)"|\'(?P<sq>[^\']*)\'|(?P<bare>[\w-]+)))?\s*\]')
+
+
+def _parse_compound(compound: str):
+    """(tag or None, [(attribute, operator, value)]) for a simple compound selector, or None if unsupported"""
+    match = _COMPOUND.match(compound)
+    if not match or not compound:
+        return None
+    tag = match.group('tag')
+    checks = []
+    rest = match.group('rest')
+    position = 0
+    while position < len(rest):
+        part = _PART.match(rest, position)
+        if not part:
+            return None
+        if part.group('cls'):
+            checks.append(('class', '~=', part.group('cls')))
+        else:
+            value = next((v for v in part.group('dq', 'sq', 'bare') if v is not None), None)
+            checks.append((part.group('attr').lower(), part.group('op'), value))
+        position = part.end()
+    return (tag.lower() if tag and tag != '*' else None, checks)
+
+
+def _compound_matches(compound, name: str, attrs: Dict) -> bool:
+    tag, checks = compound
+    if tag is not None and tag != name:
+        return False
+    for attribute, op, value in checks:
+        actual = attrs.get(attribute)
+        if actual is None:
+            return False
+        if isinstance(actual, list):
+            actual = ' '.join(actual)
+        if op is None:
+            continue
+        if op == '=':
+            matched = actual == value
+        elif op == '~=':
+            matched = value in actual.split()
+        elif not value:
+            # Empty substring/prefix/suffix selectors match nothing
+            matched = False
+        elif op == '*=':
+            matched = value in actual
+        elif op == '^=':
+            matched = actual.startswith(value)
+        else:
+            matched = actual.endswith(value)
+        if not matched:
+            return False
+    return True
+
+
+@lru_cache(maxsize=64)
+def _compile_selectors(selectors: tuple) -> List[tuple]:
+    """Compile selectors once
+
+    Selectors made of tag/class/attribute compounds joined by descendant
+    combinators become compound lists matched incrementally during the walk;
+    anything else falls back to a compiled soupsieve pattern.
+    """
+    compiled = []
+    for selector in selectors:
+        compounds = [_parse_compound(compound) for compound in selector.split()]
+        if compounds and None not in compounds:
+            compiled.append((compounds, None))
+        else:
+            compiled.append((None, soupsieve.compile(selector)))
+    return compiled
+
+
+def _scan(soup: BeautifulSoup, selectors: List[str], per_selector: int, skip_tags=(), track_sections: bool = False) -> Dict:
+    """Walk the tree once, recording text offsets for paragraphs and sections and selector matches
+
+    Returns the page text (what soup.get_text() would give with skip_tags
+    removed) plus [start, end) offsets into it, so the text of any element can
+    be sliced out without another traversal. Selector matches are kept as
+    (document order, tag) pairs.
+
+    For descendant-only selectors each node carries, per selector, how many
+    leading compounds its ancestors satisfy; matching them greedily is exact
+    for descendant combinators, so no node ever re-walks its ancestors.
+    """
+    compiled = _compile_selectors(tuple(selectors))
+    matches = [[] for _ in compiled]
+    parts = []
+    offset = 0
+    order = 0
+    paragraphs = []  # [start, end, order]
+    sections = []  # [start, end, order, last descendant order]
+
+    stack = [(soup, None, (0,) * len(compiled))]
+    while stack:
+        node, record, progress = stack.pop()
+        if record is not None:
+            # Leaving an element: close its text range
+            record[1] = offset
+            if len(record) == 4:
+                record[3] = order
+            continue
+
+        if isinstance(node, NavigableString):
+            if type(node) in TEXT_TYPES:
+                parts.append(node)
+                offset += len(node)
+            continue
+
+        name = node.name
+        if name in skip_tags:
+            continue
+
+        if node is not soup:
+            order += 1
+            attrs = node.attrs
+            advanced = []
+            for (compounds, pattern), done, found in zip(compiled, progress, matches):
+                if pattern is not None:
+                    if len(found) < per_selector and pattern.match(node):
+                        found.append((order, node))
+                    advanced.append(done)
+                    continue
+                last = len(compounds) - 1
+                if done == last and len(found) < per_selector and _compound_matches(compounds[last], name, attrs):
+                    found.append((order, node))
+                if done < last and _compound_matches(compounds[done], name, attrs):
+                    done += 1
+                advanced.append(done)
+            progress = tuple(advanced)
+
+        if name == 'p':
+            record = [offset, None, order]
+            paragraphs.append(record)
+            stack.append((node, record, None))
+        elif track_sections and name in SECTION_TAGS:
+            record = [offset, None, order, None]
+            sections.append(record)
+            stack.append((node, record, None))
+
+        stack.extend((child, None, progress) for child in reversed(node.contents))
+
+    return {'text': ''.join(parts), 'paragraphs': paragraphs, 'sections': sections, 'matches': matches}
+
+
+def _occurrences(text: str, needle: str) -> List[int]:
+    positions = []
+    start = text.find(needle)
+    while start != -1:
+        positions.append(start)
+        start = text.find(needle, start + 1)
+    return positions
+
+
+def _contains(positions: List[int], length: int, start: int, end: int) -> bool:
+    """Whether an occurrence (from _occurrences) lies entirely within text[start:end]"""
+    i = bisect_left(positions, start)
+    return i < len(positions) and positions[i] + length <= end
+
+
+def _symbol_paragraph(scan: Dict, spec: Dict, symbol: str) -> str:
+    text = scan['text']
+
+    def matching(paragraphs):
+        for start, end, _ in paragraphs:
+            candidate = text[start:end].strip()
+            if len(candidate) > spec['paragraph_min_length'] and symbol in candidate:
+                return candidate
+        return None
+
+    if spec['paragraph_scope'] == 'page':
+        return matching(scan['paragraphs'])
+
+    # Ancestors of a matching section match too, so the first in document order
+    # is the outermost one; only the paragraphs inside it are considered.
+    symbol_positions = _occurrences(text, symbol)
+    keywords = spec.get('section_keywords')
+    lowered = text.lower() if keywords else None
+    keyword_positions = [(len(word), _occurrences(lowered, word)) for word in keywords] if keywords and len(lowered) == len(text) else None
+
+    for start, end, first, last in scan['sections']:
+        if end - start <= spec.get('section_min_length', 0) or not _contains(symbol_positions, len(symbol), start, end):
+            continue
+        if keywords:
+            if keyword_positions is not None:
+                if not any(_contains(positions, length, start, end) for length, positions in keyword_positions):
+                    continue
+            elif not any(word in text[start:end].lower() for word in keywords):
+                # Lowercasing changed the text length, so offsets can't be reused
+                continue
+        return matching(p for p in scan['paragraphs'] if first < p[2] <= last)
+    return None
+
+
+def extract_listing(content, spec: Dict, symbol: str, parser: str = None) -> Dict:
+    """Headline links and the first symbol-mentioning paragraph from a listing page, in one tree walk
+
+    Links are the first three matches per selector with a long enough title,
+    deduplicated by URL; 'paragraph' is None when no paragraph qualifies.
+    """
+    soup = parse_html(content, parser)
+    scan = _scan(soup, spec['selectors'], per_selector=3, track_sections=spec['paragraph_scope'] == 'section')
+
+    links = []
+    seen_urls = set()
+    for found in scan['matches']:
+        for _, link in found:
+            title = link.get_text().strip()
+            href = link.get('href', '')
+            if len(title) > spec['min_title_length'] and href:
+                url = href if href.startswith('http') else f"{spec['base_url']}{href}"
+                if url not in seen_urls:
+                    seen_urls.add(url)
+                    links.append({'title': title, 'url': url})
+
+    paragraph = _symbol_paragraph(scan, spec, symbol) if symbol in scan['text'] else None
+    return {'links': links, 'paragraph': paragraph}
+
+
+def extract_article(content, spec: Dict = ARTICLE_SPEC, parser: str = None) -> str:
+    """Body text of an article page: the first few paragraphs under the first content selector that matches"""
+    soup = parse_html(content, parser)
+    count = spec['paragraphs']
+    scan = _scan(soup, spec['content_selectors'], per_selector=count, skip_tags=frozenset(spec['skip_tags']))
+    text = scan['text']
+
+    # Matched <p> tags map back to their recorded text ranges by document order
+    paragraph_text = {order: text[start:end].strip() for start, end, order in scan['paragraphs']}
+    chosen = next((found for found in scan['matches'] if found), [])
+    content = ' '.join(paragraph_text.get(order, tag.get_text().strip()) for order, tag in chosen)
+    if not content:
+        # Fall back to the first paragraphs anywhere on the page
+        content = ' '.join(text[start:end].strip() for start, end, _ in scan['paragraphs'][:count])
+    return content[:spec['max_length']] if content else None
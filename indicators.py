@@ -0,0 +1,213 @@
+import os
+import copy
+import json
+import math
+import threading
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+from storage import symbol_filename, write_json_atomic
+
+
+class IndicatorState:
+    """Technical indicators for one symbol, updated in O(1) per new daily bar.
+
+    Moving averages and rolling volatility keep a fixed window plus running sums,
+    EMAs/MACD and Wilder's RSI keep their accumulators, and max drawdown is taken
+    over the last DRAWDOWN_WINDOW closes (one trading year) when snapshotting.
+    The whole state round-trips through to_dict/from_dict.
+    """
+
+    SMA_WINDOWS = (20, 50)
+    EMA_FAST, EMA_SLOW, MACD_SIGNAL = 12, 26, 9
+    RSI_PERIOD = 14
+    VOLATILITY_WINDOW = 20
+    DRAWDOWN_WINDOW = 252
+
+    def __init__(self):
+        self.last_date = None
+        self.bars = 0
+        self.prev_close = None
+
+        self.sma = {window: {'values': deque(maxlen=window), 'sum': 0.0} for window in self.SMA_WINDOWS}
+        self.ema_fast = None
+        self.ema_slow = None
+        self.macd_signal = None
+
+        self.rsi_gain = 0.0
+        self.rsi_loss = 0.0
+
+        self.returns = deque(maxlen=self.VOLATILITY_WINDOW)
+        self.returns_sum = 0.0
+        self.returns_sumsq = 0.0
+
+        self.drawdown_closes = deque(maxlen=self.DRAWDOWN_WINDOW)
+
+    @staticmethod
+    def _ema(previous, value, period):
+        return value if previous is None else previous + 2.0 / (period + 1) * (value - previous)
+
+    def update(self, bar_date: int, close: float):
+        """Fold one daily close into every indicator"""
+        for window in self.sma.values():
+            if len(window['values']) == window['values'].maxlen:
+                window['sum'] -= window['values'][0]
+            window['values'].append(close)
+            window['sum'] += close
+
+        self.ema_fast = self._ema(self.ema_fast, close, self.EMA_FAST)
+        self.ema_slow = self._ema(self.ema_slow, close, self.EMA_SLOW)
+        self.macd_signal = self._ema(self.macd_signal, self.ema_fast - self.ema_slow, self.MACD_SIGNAL)
+
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            if self.bars <= self.RSI_PERIOD:
+                # Seed with a simple average over the first period
+                self.rsi_gain += gain / self.RSI_PERIOD
+                self.rsi_loss += loss / self.RSI_PERIOD
+            else:
+                # Wilder's smoothing
+                self.rsi_gain = (self.rsi_gain * (self.RSI_PERIOD - 1) + gain) / self.RSI_PERIOD
+                self.rsi_loss = (self.rsi_loss * (self.RSI_PERIOD - 1) + loss) / self.RSI_PERIOD
+
+            daily_return = close / self.prev_close - 1
+            if len(self.returns) == self.returns.maxlen:
+                oldest = self.returns[0]
+                self.returns_sum -= oldest
+                self.returns_sumsq -= oldest * oldest
+            self.returns.append(daily_return)
+            self.returns_sum += daily_return
+            self.returns_sumsq += daily_return * daily_return
+
+        self.drawdown_closes.append(close)
+
+        self.prev_close = close
+        self.last_date = int(bar_date)
+        self.bars += 1
+
+    def snapshot(self) -> Dict:
+        """Current indicator values, None where there is not enough history yet"""
+        def rounded(value, digits=2):
+            return None if value is None or math.isnan(value) else round(value, digits)
+
+        values = {}
+        for window, state in self.sma.items():
+            full = len(state['values']) == window
+            values[f'sma_{window}'] = rounded(state['sum'] / window) if full else None
+
+        macd = self.ema_fast - self.ema_slow if self.bars else None
+        values['macd'] = rounded(macd, 3)
+        values['macd_signal'] = rounded(self.macd_signal, 3)
+        values['macd_histogram'] = rounded(macd - self.macd_signal, 3) if self.bars else None
+
+        if self.bars > self.RSI_PERIOD:
+            values['rsi_14'] = 100.0 if self.rsi_loss == 0 else rounded(100 - 100 / (1 + self.rsi_gain / self.rsi_loss))
+        else:
+            values['rsi_14'] = None
+
+        n = len(self.returns)
+        if n > 1:
+            variance = max(0.0, (self.returns_sumsq - self.returns_sum ** 2 / n) / (n - 1))
+            values['volatility_20d'] = rounded(math.sqrt(variance) * math.sqrt(252) * 100)
+        else:
+            values['volatility_20d'] = None
+
+        if self.drawdown_closes:
+            closes = np.array(self.drawdown_closes)
+            values['max_drawdown'] = rounded(float((closes / np.maximum.accumulate(closes) - 1).min()) * 100)
+        else:
+            values['max_drawdown'] = None
+        return values
+
+    def to_dict(self) -> Dict:
+        state = {key: value for key, value in self.__dict__.items() if key not in ('sma', 'returns', 'drawdown_closes')}
+        state['sma'] = {str(window): list(s['values']) for window, s in self.sma.items()}
+        state['returns'] = list(self.returns)
+        state['drawdown_closes'] = list(self.drawdown_closes)
+        return state
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'IndicatorState':
+        state = cls()
+        for key, value in data.items():
+            if key == 'sma':
+                for window, values in value.items():
+                    window = int(window)
+                    if window in state.sma:
+                        state.sma[window]['values'].extend(values)
+                        state.sma[window]['sum'] = float(sum(state.sma[window]['values']))
+            elif key == 'returns':
+                state.returns.extend(value)
+                state.returns_sum = float(sum(state.returns))
+                state.returns_sumsq = float(sum(r * r for r in state.returns))
+            elif key == 'drawdown_closes':
+                state.drawdown_closes.extend(value)
+            elif key not in ('returns_sum', 'returns_sumsq'):
+                setattr(state, key, value)
+        return state
+
+
+class IndicatorStore:
+    """Persists an IndicatorState per symbol and folds in only bars it has not seen.
+
+    The most recent bar may still be a partial intraday bar, so it is applied to
+    a throwaway copy for the snapshot and only committed once a newer bar arrives.
+    If the last committed close no longer matches the bars (the history was
+    re-adjusted for a split or dividend), the state is rebuilt from the bars.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.store_dir, f"{symbol_filename(symbol)}.json")
+
+    def _load(self, symbol: str) -> IndicatorState:
+        path = self._path(symbol)
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                # States saved with a since-inception drawdown are rebuilt from the bars
+                if 'drawdown_closes' in data:
+                    return IndicatorState.from_dict(data)
+            except (OSError, ValueError) as e:
+                print(f"Error loading indicators for {symbol}: {e}")
+        return IndicatorState()
+
+    def _save(self, symbol: str, state: IndicatorState):
+        write_json_atomic(self._path(symbol), state.to_dict())
+
+    def update(self, symbol: str, bars: Dict[str, np.ndarray]) -> Dict:
+        """Fold new bars into the symbol's state and return the current indicator values"""
+        dates, closes = bars['date'], bars['close']
+        if not len(closes):
+            return None
+
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is None:
+                state = self._states[symbol] = self._load(symbol)
+
+            start = 0 if state.last_date is None else int(np.searchsorted(dates, state.last_date, side='right'))
+            if start and dates[start - 1] == state.last_date and not math.isclose(closes[start - 1], state.prev_close, rel_tol=1e-4):
+                state = self._states[symbol] = IndicatorState()
+                start = 0
+
+            # Commit every bar except the latest, which may still change intraday
+            for i in range(start, len(closes) - 1):
+                state.update(dates[i], float(closes[i]))
+            if start < len(closes) - 1:
+                self._save(symbol, state)
+
+            provisional = state
+            if state.last_date is None or dates[-1] > state.last_date:
+                provisional = copy.deepcopy(state)
+                provisional.update(dates[-1], float(closes[-1]))
+            return provisional.snapshot()
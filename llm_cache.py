@@ -0,0 +1,71 @@
+import json
+import math
+import time
+import hashlib
+from typing import Dict, List
+
+from two_tier_store import TwoTierStore
+
+
+def _round_significant(value: float, digits: int) -> float:
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def quant_snapshot(quant_data: Dict, digits: int = 2) -> Dict:
+    """Quant data with every number rounded to a few significant figures
+
+    Small ticks (a price moving from 187.23 to 187.60) leave the snapshot
+    unchanged, while material moves change it.
+    """
+    if not quant_data:
+        return {}
+
+    def rounded(value):
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float)):
+            return _round_significant(float(value), digits)
+        if isinstance(value, dict):
+            return {key: rounded(item) for key, item in sorted(value.items())}
+        return value
+
+    return rounded(quant_data)
+
+
+class CompletionCache:
+    """Two-tier cache of LLM completions with TTL and size-based eviction.
+
+    The in-memory tier is an LRU of up to `capacity` entries; the optional
+    SQLite tier keeps up to `sqlite_capacity` entries across restarts and
+    promotes hits back into memory. Entries expire `ttl` seconds after they
+    were stored, in both tiers.
+    """
+
+    def __init__(self, capacity: int = 1000, ttl: float = 3600, sqlite_path: str = None, sqlite_capacity: int = 10000):
+        self.ttl = ttl
+        self._store = TwoTierStore('completions', capacity, sqlite_path=sqlite_path, sqlite_capacity=sqlite_capacity)
+
+    @staticmethod
+    def key(model: str, system_prompt: str, doc_ids: List[int], quant: Dict = None, **scope) -> str:
+        """Cache key from the model, system prompt, document ID set, rounded quant snapshot and any extra scope (symbol, category, ...)"""
+        payload = json.dumps({
+            'model': model,
+            'system': system_prompt,
+            'docs': hashlib.sha256(','.join(str(doc_id) for doc_id in sorted(doc_ids)).encode()).hexdigest(),
+            'quant': quant or {},
+            'scope': scope
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """Cached completion, or None on a miss"""
+        cached = self._store.get(key)
+        return None if cached is None else cached[0]
+
+    def put(self, key: str, value):
+        self._store.put(key, value, time.time() + self.ttl)
+
+    def stats(self) -> Dict:
+        return self._store.stats()
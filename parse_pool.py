@@ -0,0 +1,56 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict
+
+from html_parsing import ARTICLE_SPEC, SOURCE_SPECS, extract_article, extract_listing
+
+
+class ParsePool:
+    """Runs HTML parsing and selector matching in worker processes.
+
+    Callers pass raw response bytes plus a source key or spec and get plain
+    dicts/strings back, so fetching stays on threads while parsing, which is
+    CPU-bound and holds the GIL, spreads across cores. With workers=0, or if
+    the pool breaks, pages are parsed inline on the calling thread.
+
+    Workers are started with forkserver (spawn where it is unavailable), never
+    fork: the server process is multi-threaded by the time the pool starts, and
+    forking it can copy locks held by other threads into the children. Both
+    methods import the main module in the workers as __mp_main__, so it must
+    neither start the app nor import heavy dependencies at module level.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self.executor = None
+        if workers > 0:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            context = multiprocessing.get_context(method)
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+    def _run(self, fn, *args):
+        if self.executor is not None:
+            try:
+                return self.executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                print("Parse pool is broken, parsing inline")
+                self.executor = None
+        return fn(*args)
+
+    def warm_up(self):
+        """Start the worker processes before the first request needs them"""
+        self._run(extract_article, b'<p>warm up</p>', ARTICLE_SPEC)
+
+    def listing(self, content: bytes, source: str, symbol: str) -> Dict:
+        """Headline links and a symbol paragraph from a listing page of one of SOURCE_SPECS"""
+        return self._run(extract_listing, content, SOURCE_SPECS[source], symbol)
+
+    def article(self, content: bytes, spec: Dict = ARTICLE_SPEC) -> str:
+        """Body text of an article page"""
+        return self._run(extract_article, content, spec)
+
+    def shutdown(self):
+        """Stop the worker processes (callers wait on their parses, so none are queued at exit)"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
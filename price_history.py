@@ -0,0 +1,162 @@
+import os
+import threading
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from storage import symbol_filename
+
+COLUMNS = {
+    'date': 'int64',  # days since 1970-01-01
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'float64'
+}
+
+
+def bars_from_frame(hist) -> Dict[str, np.ndarray]:
+    """Convert a yfinance OHLCV DataFrame into column arrays, dropping bars without a close"""
+    hist = hist.dropna(subset=['Close'])
+    return {
+        'date': np.array(hist.index.date, dtype='datetime64[D]').astype('int64'),
+        'open': hist['Open'].to_numpy(dtype='float64'),
+        'high': hist['High'].to_numpy(dtype='float64'),
+        'low': hist['Low'].to_numpy(dtype='float64'),
+        'close': hist['Close'].to_numpy(dtype='float64'),
+        'volume': hist['Volume'].to_numpy(dtype='float64')
+    }
+
+
+def trailing_window(bars: Dict[str, np.ndarray], days: int) -> Dict[str, np.ndarray]:
+    """Bars dated within the last `days` calendar days of the most recent bar"""
+    if not len(bars['date']):
+        return bars
+    start = np.searchsorted(bars['date'], bars['date'][-1] - days)
+    return {column: values[start:] for column, values in bars.items()}
+
+
+class PriceHistoryStore:
+    """Local columnar store of daily OHLCV bars, one append-only file per column per symbol.
+
+    Only bars from the second-to-last stored date onwards are fetched; the last
+    stored bar is replaced because it may have been a partial intraday bar when
+    it was written. The bars are split/dividend adjusted, so the settled bar
+    that overlaps the fetch is compared with the stored one: if its close
+    changed, the series was re-adjusted and the symbol's history is refetched
+    in full. Columns are read back through np.memmap.
+    """
+
+    # Relative close difference beyond which the overlapping bar counts as re-adjusted
+    ADJUSTMENT_TOLERANCE = 1e-4
+
+    def __init__(self, store_dir: str, fetcher, initial_days: int = 380):
+        self.store_dir = store_dir
+        self.fetcher = fetcher
+        self.initial_days = initial_days
+        os.makedirs(store_dir, exist_ok=True)
+
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _column_path(self, symbol: str, column: str) -> str:
+        return os.path.join(self.store_dir, symbol_filename(symbol), f"{column}.bin")
+
+    def _read(self, symbol: str) -> Dict[str, np.ndarray]:
+        columns = {}
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(symbol, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            columns[column] = np.memmap(path, dtype=dtype, mode='r') if size else np.empty(0, dtype=dtype)
+
+        # A crash mid-append can leave columns of different lengths; trust the shortest
+        length = min(len(values) for values in columns.values())
+        return {column: values[:length] for column, values in columns.items()}
+
+    def _append(self, symbol: str, stored_length: int, bars: Dict[str, np.ndarray]):
+        os.makedirs(os.path.dirname(self._column_path(symbol, 'date')), exist_ok=True)
+        for column, dtype in COLUMNS.items():
+            path = self._column_path(symbol, column)
+            with open(path, 'ab') as f:
+                f.truncate(stored_length * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(bars[column], dtype=dtype).tobytes())
+
+    def _resume_date(self, symbol: str):
+        """Date incremental fetches start from: the second-to-last stored bar, or None for an unknown symbol"""
+        with self._symbol_lock(symbol):
+            dates = self._read(symbol)['date']
+            if not len(dates):
+                return None
+            return date.fromordinal(date(1970, 1, 1).toordinal() + int(dates[-2] if len(dates) > 1 else dates[-1]))
+
+    def _same_adjustment(self, stored: Dict[str, np.ndarray], new_bars: Dict[str, np.ndarray]) -> bool:
+        """Whether fetched bars match the stored settled bars (every one but the last) on the dates they share"""
+        _, stored_idx, new_idx = np.intersect1d(stored['date'][:-1], new_bars['date'], return_indices=True)
+        return np.allclose(stored['close'][stored_idx], new_bars['close'][new_idx], rtol=self.ADJUSTMENT_TOLERANCE, atol=0)
+
+    def last_date(self, symbol: str):
+        """Date of the most recent stored bar, or None for an unknown symbol"""
+        with self._symbol_lock(symbol):
+            dates = self._read(symbol)['date']
+            return date.fromordinal(date(1970, 1, 1).toordinal() + int(dates[-1])) if len(dates) else None
+
+    def get(self, symbol: str, days: int = 365) -> Dict[str, np.ndarray]:
+        """Copy of the stored bars for the trailing window"""
+        with self._symbol_lock(symbol):
+            window = trailing_window(self._read(symbol), days)
+            return {column: np.array(values) for column, values in window.items()}
+
+    def update(self, symbols: List[str], days: int = 365) -> Dict[str, Dict[str, np.ndarray]]:
+        """Fetch and append new bars for the symbols, returning each symbol's trailing window
+
+        Symbols are grouped by the date they need bars from, so a warm watchlist
+        is refreshed with a single batched download of a few bars per symbol.
+        """
+        full_start = date.today() - timedelta(days=self.initial_days)
+        starts = {}
+        for symbol in symbols:
+            starts.setdefault(self._resume_date(symbol) or full_start, []).append(symbol)
+
+        readjusted = []
+        for start, group in starts.items():
+            readjusted += self._fetch_and_store(group, start)
+
+        # A split or dividend re-adjusted these symbols' history; rewrite it from scratch
+        if readjusted:
+            print(f"Price history re-adjusted for {', '.join(readjusted)}, refetching")
+            self._fetch_and_store(readjusted, full_start, rebuild=True)
+
+        return {symbol: self.get(symbol, days) for symbol in symbols}
+
+    def _fetch_and_store(self, symbols: List[str], start: date, rebuild: bool = False) -> List[str]:
+        """Fetch bars from start and store them, returning the symbols whose stored bars no longer match"""
+        try:
+            fetched = self.fetcher.fetch_history(symbols, start=start)
+        except Exception as e:
+            print(f"Error fetching price history: {e}")
+            return []
+
+        readjusted = []
+        for symbol in symbols:
+            hist = fetched.get(symbol)
+            if hist is None or hist.empty:
+                continue
+            new_bars = bars_from_frame(hist)
+            if not len(new_bars['date']):
+                continue
+            with self._symbol_lock(symbol):
+                stored = self._read(symbol)
+                if not rebuild and not self._same_adjustment(stored, new_bars):
+                    readjusted.append(symbol)
+                    continue
+                # Keep stored bars strictly before the first fetched date, replace the rest
+                keep = 0 if rebuild else int(np.searchsorted(stored['date'], new_bars['date'][0]))
+                del stored
+                self._append(symbol, keep, new_bars)
+        return readjusted
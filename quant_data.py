@@ -0,0 +1,174 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+import yfinance as yf
+
+from price_history import bars_from_frame
+from screener import compute_universe_metrics
+
+
+class YFinanceFetcher:
+    """Default market data fetcher backed by yfinance.
+
+    Any object with the same fetch_info/fetch_history methods can be passed to
+    QuantDataCache instead, e.g. a local stand-in serving saved data.
+    """
+
+    def fetch_info(self, symbol: str) -> Dict:
+        return yf.Ticker(symbol).info
+
+    def fetch_history(self, symbols: List[str], period: str = "1y", start=None) -> Dict:
+        """Daily OHLCV bars per symbol (from start if given, else for period), using one multi-ticker download for several symbols"""
+        window = {'start': start} if start else {'period': period}
+        if len(symbols) == 1:
+            return {symbols[0]: yf.Ticker(symbols[0]).history(**window)}
+
+        data = yf.download(symbols, group_by='ticker', auto_adjust=True, progress=False, threads=True, **window)
+        history = {}
+        for symbol in symbols:
+            try:
+                history[symbol] = data[symbol].dropna(how='all')
+            except KeyError:
+                history[symbol] = data.iloc[0:0]
+        return history
+
+
+def compute_quant_metrics(stock_symbol: str, info: Dict, bars: Dict[str, np.ndarray]) -> Dict:
+    """Derive the quantitative metrics shown in the UI from yfinance info and daily bar arrays"""
+    if not len(bars['close']):
+        return None
+
+    # Same vectorized engine as the screener, over a single-row universe
+    metrics = {name: values[0] for name, values in compute_universe_metrics(
+        bars['close'][None, :], bars['high'][None, :], bars['low'][None, :], bars['volume'][None, :]
+    ).items()}
+
+    return {
+        'current_price': round(float(metrics['current_price']), 2),
+        'price_change_1d': round(float(metrics['price_change_1d']), 2),
+        'volatility': round(float(metrics['volatility']), 2),
+        'volume_avg': int(metrics['volume_avg']),
+        'week_52_high': round(float(metrics['week_52_high']), 2),
+        'week_52_low': round(float(metrics['week_52_low']), 2),
+        'pct_from_high': round(float(metrics['pct_from_high']), 2),
+        'pct_from_low': round(float(metrics['pct_from_low']), 2),
+        'market_cap': info.get('marketCap', 'N/A'),
+        'pe_ratio': info.get('forwardPE', info.get('trailingPE', 'N/A')),
+        'dividend_yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0,
+        'beta': info.get('beta', 'N/A'),
+        'eps': info.get('trailingEps', 'N/A'),
+        'book_value': info.get('bookValue', 'N/A'),
+        'debt_to_equity': info.get('debtToEquity', 'N/A'),
+        'roe': info.get('returnOnEquity', 0) * 100 if info.get('returnOnEquity') else 'N/A',
+        'sector': info.get('sector', 'N/A'),
+        'industry': info.get('industry', 'N/A'),
+        'company_name': info.get('longName', stock_symbol)
+    }
+
+
+class QuantDataCache:
+    """TTL cache in front of the quant data fetcher.
+
+    Price history drives the intraday fields (price, change, volatility, range)
+    and expires after price_ttl seconds; the slow-moving info payload (sector,
+    beta, book value, ...) is kept for info_ttl seconds. With a history_store,
+    expired histories are refreshed incrementally instead of refetching a year;
+    with an indicator_store, technical indicators are added under 'indicators'.
+    """
+
+    def __init__(self, fetcher=None, history_store=None, indicator_store=None, price_ttl: float = 60, info_ttl: float = 6 * 3600, max_workers: int = 8):
+        self.fetcher = fetcher or YFinanceFetcher()
+        self.history_store = history_store
+        self.indicator_store = indicator_store
+        self.price_ttl = price_ttl
+        self.info_ttl = info_ttl
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+
+        self._history = {}  # symbol -> (fetched_at, bar arrays)
+        self._info = {}  # symbol -> (fetched_at, dict)
+        self._lock = threading.Lock()
+
+    def _fresh(self, cache: Dict, symbol: str, ttl: float):
+        with self._lock:
+            entry = cache.get(symbol)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def _put(self, cache: Dict, symbol: str, value):
+        with self._lock:
+            cache[symbol] = (time.monotonic(), value)
+
+    def _get_info(self, symbol: str) -> Dict:
+        info = self._fresh(self._info, symbol, self.info_ttl)
+        if info is None:
+            info = self.fetcher.fetch_info(symbol) or {}
+            self._put(self._info, symbol, info)
+        return info
+
+    def _fetch_bars(self, symbols: List[str]) -> Dict[str, Dict[str, np.ndarray]]:
+        """Latest year of daily bars for the symbols, from the local store when available"""
+        if self.history_store:
+            return self.history_store.update(symbols)
+        try:
+            fetched = self.fetcher.fetch_history(symbols)
+        except Exception as e:
+            print(f"Error fetching price history: {e}")
+            return {}
+        return {symbol: bars_from_frame(hist) for symbol, hist in fetched.items()}
+
+    def get(self, symbol: str) -> Dict:
+        """Quant metrics for one symbol, or None if no price history is available"""
+        return self.get_many([symbol]).get(symbol)
+
+    def get_bars_many(self, symbols: List[str]) -> Dict[str, Dict[str, np.ndarray]]:
+        """Daily bars for many symbols, refreshing all stale histories in one batched fetch"""
+        symbols = list(dict.fromkeys(symbols))
+        histories = {symbol: self._fresh(self._history, symbol, self.price_ttl) for symbol in symbols}
+        stale = [symbol for symbol, hist in histories.items() if hist is None]
+        with self._lock:
+            self.hits += len(symbols) - len(stale)
+            self.misses += len(stale)
+
+        if stale:
+            for symbol, bars in self._fetch_bars(stale).items():
+                histories[symbol] = bars
+                self._put(self._history, symbol, bars)
+        return histories
+
+    def get_many(self, symbols: List[str]) -> Dict[str, Dict]:
+        """Quant metrics for many symbols, fetching all stale histories in one batched download"""
+        symbols = list(dict.fromkeys(symbols))
+        histories = self.get_bars_many(symbols)
+
+        def metrics(symbol):
+            bars = histories.get(symbol)
+            if bars is None or not len(bars['close']):
+                return None
+            try:
+                quant = compute_quant_metrics(symbol, self._get_info(symbol), bars)
+                if quant and self.indicator_store:
+                    quant['indicators'] = self.indicator_store.update(symbol, bars)
+                return quant
+            except Exception as e:
+                print(f"Error fetching quantitative data: {e}")
+                return None
+
+        if len(symbols) <= 1:
+            return {symbol: metrics(symbol) for symbol in symbols}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as executor:
+            return dict(zip(symbols, executor.map(metrics, symbols)))
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'symbols': len(self._history),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,23 +1,107 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 from openai import OpenAI
 from typing import List, Dict
-from bs4 import BeautifulSoup
 import time
-import re
+import queue
+import threading
 import json
+import contextvars
 from datetime import datetime
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, wait
+from rate_limiter import HostRateLimiter
+from embedding_cache import EmbeddingCache
+from symbol_index import SymbolIndexStore, document_id
+from quant_data import QuantDataCache, YFinanceFetcher
+from price_history import PriceHistoryStore
+from screener import compute_universe_metrics, screen, stack_bars
+from indicators import IndicatorStore
+from html_parsing import ARTICLE_SPEC
+from parse_pool import ParsePool
+from dedupe import HeadlineIndex, remove_near_duplicates
+from categorizer import EmbeddingCategorizer, KeywordCategorizer, load_category_keywords
+from llm_cache import CompletionCache, quant_snapshot
+from analysis_memory import AnalysisMemory
+from result_cache import ResultCache
+from single_flight import SingleFlight, SingleFlightTimeout
+import atexit
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+LLM_MODEL = 'gpt-3.5-turbo'
+COMBINED_SYSTEM_PROMPT = "You are a professional financial analyst providing objective analysis based on recent news and quantitative data. Always respond with a single JSON object."
+CACHE_DIR = os.getenv('RAG_CACHE_DIR', '.rag_cache')
+
+ANALYSIS_MODES = ('per_category', 'single')
+CATEGORY_ERROR_PREFIX = "Error generating analysis for this category"
+
+# Set while a scheduler refresh runs; its scrapes wait behind user requests instead of borrowing tokens
+BACKGROUND_FETCH = contextvars.ContextVar('background_fetch', default=False)
+
+# Any paragraphs, without preferring article-content containers
+PLAIN_ARTICLE_SPEC = {**ARTICLE_SPEC, 'skip_tags': ['script', 'style', 'nav', 'header', 'footer'], 'content_selectors': []}
+
+class AnalysisContext:
+    """Per-request retrieval state: the FAISS index and the documents it was built from
+    
+    When symbol is set, retrieval goes to that symbol's persistent index instead
+    and document_count is the number of documents it holds.
+    """
+    
+    def __init__(self, documents: List[Dict] = None, index=None, symbol: str = None, document_count: int = None):
+        self.documents = documents or []
+        self.index = index
+        self.symbol = symbol
+        self.document_count = len(self.documents) if document_count is None else document_count
+
 
 class StockRAGSystem:
     def __init__(self):
+        # Shared, stateless resources: safe to use from many concurrent analyses
         self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.index = None
-        self.documents = []
+        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        
+        # Content-addressed embedding cache so repeated headlines are never re-encoded
+        self.embedding_cache = None
+        if os.getenv('EMBEDDING_CACHE', '1') != '0':
+            self.embedding_cache = EmbeddingCache(
+                os.path.join(CACHE_DIR, 'embeddings'),
+                EMBEDDING_MODEL_NAME,
+                self.embedding_model.get_sentence_embedding_dimension(),
+                capacity=int(os.getenv('EMBEDDING_CACHE_SIZE', '50000'))
+            )
+            atexit.register(self.embedding_cache.flush)
+        
+        # Persistent per-symbol FAISS indexes, updated incrementally between requests
+        self.symbol_index = None
+        if os.getenv('SYMBOL_INDEX', '1') != '0':
+            self.symbol_index = SymbolIndexStore(
+                os.path.join(CACHE_DIR, 'indexes'),
+                self.embedding_model.get_sentence_embedding_dimension(),
+                max_age_seconds=float(os.getenv('SYMBOL_INDEX_MAX_AGE_HOURS', '48')) * 3600
+            )
+        
+        # Keyword taxonomy compiled once; CATEGORY_KEYWORDS_FILE overrides categories' keywords.
+        # RAG_CATEGORIZER=embedding classifies by similarity to category prototype vectors instead.
+        category_keywords = load_category_keywords(os.getenv('CATEGORY_KEYWORDS_FILE'))
+        categorizer = os.getenv('RAG_CATEGORIZER', 'keyword')
+        if categorizer == 'embedding':
+            self.categorizer = EmbeddingCategorizer(self._encode_texts, category_keywords)
+        elif categorizer == 'keyword':
+            self.categorizer = KeywordCategorizer(category_keywords)
+        else:
+            raise ValueError(f"Unknown RAG_CATEGORIZER '{categorizer}'. Use 'keyword' or 'embedding'")
+        
+        # Near-duplicate headline index shared across requests and symbols
+        self.headline_index = None
+        if os.getenv('HEADLINE_INDEX', '1') != '0':
+            self.headline_index = HeadlineIndex(
+                os.path.join(CACHE_DIR, 'headlines'),
+                max_age_seconds=float(os.getenv('HEADLINE_INDEX_MAX_AGE_DAYS', '30')) * 24 * 3600
+            )
         
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -28,13 +112,139 @@ class StockRAGSystem:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
+        
+        # Use more realistic headers for Seeking Alpha
+        self.seeking_alpha_headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Referer': 'https://www.google.com/',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1'
+        }
+        
+        # Market data cache: short TTL for prices, long TTL for slow-moving company info.
+        # Daily bars live in a local store that only fetches bars newer than what it has.
+        fetcher = YFinanceFetcher()
+        self.price_history = PriceHistoryStore(os.path.join(CACHE_DIR, 'prices'), fetcher)
+        self.quant_data = QuantDataCache(
+            fetcher,
+            history_store=self.price_history,
+            indicator_store=IndicatorStore(os.path.join(CACHE_DIR, 'indicators')),
+            price_ttl=float(os.getenv('QUANT_PRICE_TTL', '60')),
+            info_ttl=float(os.getenv('QUANT_INFO_TTL', str(6 * 3600)))
+        )
+        
+        # Pooled HTTP sessions shared by all requests (urllib3 pools are thread-safe)
+        self.session = self._create_session(self.headers)
+        self.seeking_alpha_session = self._create_session(self.seeking_alpha_headers)
+        
+        # Article bodies are fetched through one bounded pool shared by all requests
+        self.article_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('ARTICLE_FETCH_WORKERS', '8')),
+            thread_name_prefix='article-fetch'
+        )
+        self.article_fetch_deadline = float(os.getenv('ARTICLE_FETCH_DEADLINE', '20'))
+        
+        # Fetched pages are parsed in worker processes so parsing isn't serialized on the GIL;
+        # one core is left for the server threads, and single-core hosts parse inline
+        self.parse_pool = ParsePool(workers=int(os.getenv('PARSE_WORKERS', str(min(4, (os.cpu_count() or 1) - 1)))))
+        atexit.register(self.parse_pool.shutdown)
+        
+        # LLM calls are fanned out through a shared pool with a per-call timeout
+        self.llm_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('LLM_MAX_CONCURRENCY', '5')),
+            thread_name_prefix='llm'
+        )
+        self.llm_timeout = float(os.getenv('LLM_TIMEOUT', '30'))
+        # Upper bound on a streamed analysis waiting for its categories, queueing included
+        self.category_stream_deadline = float(os.getenv('CATEGORY_STREAM_DEADLINE', '120'))
+        
+        # Completions keyed by prompt, document set and rounded quant data, so repeat
+        # requests for unchanged evidence skip the LLM (SQLite tier survives restarts)
+        self.llm_cache = None
+        if os.getenv('LLM_CACHE', '1') != '0':
+            self.llm_cache = CompletionCache(
+                capacity=int(os.getenv('LLM_CACHE_SIZE', '1000')),
+                ttl=float(os.getenv('LLM_CACHE_TTL', '3600')),
+                sqlite_path=os.path.join(CACHE_DIR, 'llm_cache.sqlite3') if os.getenv('LLM_CACHE_SQLITE', '1') != '0' else None
+            )
+        
+        # Last analysis per symbol with the documents and quant fields behind each category,
+        # so categories whose evidence hasn't changed are reused instead of regenerated
+        self.analysis_memory = None
+        if os.getenv('ANALYSIS_MEMORY', '1') != '0':
+            self.analysis_memory = AnalysisMemory(
+                os.path.join(CACHE_DIR, 'analyses'),
+                max_age_seconds=float(os.getenv('ANALYSIS_MEMORY_MAX_AGE_HOURS', '6')) * 3600
+            )
+        
+        # Full analyze_stock results, fresh for a short TTL while the market is open and a long
+        # one outside it; stale results are served while a background refresh recomputes them
+        self.result_cache = None
+        if os.getenv('RESULT_CACHE', '1') != '0':
+            self.result_cache = ResultCache(
+                capacity=int(os.getenv('RESULT_CACHE_SIZE', '200')),
+                sqlite_path=os.path.join(CACHE_DIR, 'results.sqlite3') if os.getenv('RESULT_CACHE_SQLITE', '1') != '0' else None,
+                open_ttl=float(os.getenv('RESULT_TTL_MARKET_OPEN', '300')),
+                closed_ttl=float(os.getenv('RESULT_TTL_MARKET_CLOSED', str(4 * 3600))),
+                stale_ttl=float(os.getenv('RESULT_STALE_TTL', str(6 * 3600)))
+            )
+        
+        # Concurrent requests for the same symbol and mode share one pipeline run
+        self.single_flight = SingleFlight(wait_timeout=float(os.getenv('SINGLE_FLIGHT_WAIT', '90')))
+        self.analysis_mode = os.getenv('ANALYSIS_MODE', 'per_category')
+        
+        # Politeness is enforced per host, so different sources never wait on each other
+        self.rate_limiter = HostRateLimiter(
+            rate=float(os.getenv('SCRAPE_RATE_PER_HOST', '2')),
+            burst=2,
+            host_rates={'seekingalpha.com': (1.0, 1)}  # Seeking Alpha might be more strict
+        )
+    
+    def _create_session(self, headers: Dict) -> requests.Session:
+        """Create a pooled HTTP session that can be shared across threads"""
+        session = requests.Session()
+        session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=32)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def _fetch(self, session: requests.Session, url: str, timeout: float) -> requests.Response:
+        """GET a URL once the per-host rate limiter allows it"""
+        self.rate_limiter.acquire(url, borrow=not BACKGROUND_FETCH.get())
+        return session.get(url, timeout=timeout)
+    
+    def warm_up(self):
+        """Run a dummy encode and start the parse workers so the first real request doesn't pay warm-up costs"""
+        self.embedding_model.encode(["warm up"])
+        self.parse_pool.warm_up()
+    
+    def get_stats(self) -> Dict:
+        """Counters for the shared caches"""
+        return {
+            'embedding_cache': self.embedding_cache.stats() if self.embedding_cache else None,
+            'quant_cache': self.quant_data.stats(),
+            'headline_index': self.headline_index.stats() if self.headline_index else None,
+            'llm_cache': self.llm_cache.stats() if self.llm_cache else None,
+            'analysis_memory': self.analysis_memory.stats() if self.analysis_memory else None,
+            'result_cache': self.result_cache.stats() if self.result_cache else None,
+            'single_flight': self.single_flight.stats()
+        }
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, reusing cached vectors where available"""
+        if self.embedding_cache:
+            return self.embedding_cache.encode(texts, self.embedding_model.encode)
+        return np.asarray(self.embedding_model.encode(texts), dtype='float32')
     
     def scrape_yahoo_finance(self, stock_symbol: str) -> List[Dict]:
         """Scrape Yahoo Finance for stock news"""
         articles = []
         try:
-            time.sleep(2)
-            
             # Try multiple Yahoo Finance URLs for better content
             urls = [
                 f"https://finance.yahoo.com/quote/{stock_symbol}/news",
@@ -42,68 +252,29 @@ class StockRAGSystem:
                 f"https://finance.yahoo.com/news/{stock_symbol.lower()}"
             ]
             
-            session = requests.Session()
-            session.headers.update(self.headers)
+            session = self.session
             
             for url in urls:
                 try:
-                    response = session.get(url, timeout=15)
+                    response = self._fetch(session, url, timeout=15)
                     print(f"Yahoo Finance {url}: {response.status_code}")
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Look for news articles with different selectors
-                        selectors = [
-                            '[data-testid="story-title"] a',
-                            'h3[class*="title"] a',
-                            'a[data-testid="story-title"]',
-                            'a[class*="storylink"]',
-                            'h3 a[href*="/news/"]',
-                            'div[class*="news"] h3 a',
-                            'li[class*="news"] a'
-                        ]
+                        # One pass over the page collects headline links and a symbol paragraph
+                        page = self.parse_pool.listing(response.content, 'yahoo', stock_symbol)
                         
-                        for selector in selectors:
-                            links = soup.select(selector)
-                            for link in links[:3]:  # Limit to 3 per selector
-                                try:
-                                    title = link.get_text().strip()
-                                    href = link.get('href', '')
-                                    
-                                    if len(title) > 20 and href:
-                                        # Construct full URL
-                                        article_url = href if href.startswith('http') else f"https://finance.yahoo.com{href}"
-                                        
-                                        # Get article content
-                                        content = self._get_article_content(article_url, session)
-                                        
-                                        articles.append({
-                                            'title': title,
-                                            'content': content or title,
-                                            'url': article_url,
-                                            'source': 'Yahoo Finance',
-                                            'timestamp': datetime.now().isoformat()
-                                        })
-                                except Exception:
-                                    continue
+                        # Fetch the linked article bodies concurrently
+                        articles.extend(self._build_linked_articles(page['links'], session, 'Yahoo Finance'))
                         
-                        # Also look for any text content mentioning the stock
-                        text_content = soup.get_text()
-                        if stock_symbol in text_content:
-                            # Extract relevant paragraphs
-                            paragraphs = soup.find_all('p')
-                            for p in paragraphs:
-                                text = p.get_text().strip()
-                                if len(text) > 50 and stock_symbol in text:
-                                    articles.append({
-                                        'title': f'{stock_symbol} Market Information',
-                                        'content': text[:300],
-                                        'url': url,
-                                        'source': 'Yahoo Finance',
-                                        'timestamp': datetime.now().isoformat()
-                                    })
-                                    break
+                        # Also keep a paragraph mentioning the stock
+                        if page['paragraph']:
+                            articles.append({
+                                'title': f'{stock_symbol} Market Information',
+                                'content': page['paragraph'][:300],
+                                'url': url,
+                                'source': 'Yahoo Finance',
+                                'timestamp': datetime.now().isoformat()
+                            })
                         
                         if articles:
                             break  # Found articles, no need to try other URLs
@@ -117,40 +288,39 @@ class StockRAGSystem:
             
         return articles
     
+    def _fetch_article_bodies(self, urls: List[str], session: requests.Session) -> Dict[str, str]:
+        """Fetch article bodies through the shared bounded pool, giving up at the deadline"""
+        # Each task runs in a copy of the caller's context so BACKGROUND_FETCH carries over
+        futures = {url: self.article_executor.submit(contextvars.copy_context().run, self._get_article_content, url, session)
+                   for url in urls}
+        done, not_done = wait(futures.values(), timeout=self.article_fetch_deadline)
+        for future in not_done:
+            future.cancel()
+        
+        bodies = {}
+        for url, future in futures.items():
+            if future in done and not future.exception():
+                bodies[url] = future.result()
+        return bodies
+    
+    def _build_linked_articles(self, links: List[Dict], session: requests.Session, source: str) -> List[Dict]:
+        """Turn collected headline links into articles, using the headline when no body was fetched"""
+        bodies = self._fetch_article_bodies([link['url'] for link in links], session)
+        return [{
+            'title': link['title'],
+            'content': bodies.get(link['url']) or link['title'],
+            'url': link['url'],
+            'source': source,
+            'timestamp': datetime.now().isoformat()
+        } for link in links]
+    
     def _get_article_content(self, url: str, session: requests.Session) -> str:
         """Extract content from article URL"""
         try:
-            response = session.get(url, timeout=10)
+            response = self._fetch(session, url, timeout=10)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Remove unwanted elements
-                for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                    element.decompose()
-                
-                # Look for article content with common selectors
-                content_selectors = [
-                    'div[class*="content"] p',
-                    'div[class*="body"] p',
-                    'article p',
-                    'div[class*="text"] p',
-                    '.content p',
-                    '.article-body p'
-                ]
-                
-                content = ""
-                for selector in content_selectors:
-                    paragraphs = soup.select(selector)
-                    if paragraphs:
-                        content = ' '.join([p.get_text().strip() for p in paragraphs[:3]])
-                        break
-                
-                # Fallback to any paragraphs
-                if not content:
-                    paragraphs = soup.find_all('p')
-                    content = ' '.join([p.get_text().strip() for p in paragraphs[:3]])
-                
-                return content[:500] if content else None
+                # Skips script/nav/footer boilerplate and takes the first content paragraphs
+                return self.parse_pool.article(response.content)
                 
         except Exception:
             return None
@@ -159,8 +329,6 @@ class StockRAGSystem:
         """Scrape MarketWatch for stock news"""
         articles = []
         try:
-            time.sleep(2)
-            
             # Try multiple MarketWatch URLs
             urls = [
                 f"https://www.marketwatch.com/investing/stock/{stock_symbol.lower()}",
@@ -168,72 +336,29 @@ class StockRAGSystem:
                 f"https://www.marketwatch.com/search?q={stock_symbol}"
             ]
             
-            session = requests.Session()
-            session.headers.update(self.headers)
+            session = self.session
             
             for url in urls:
                 try:
-                    response = session.get(url, timeout=15)
+                    response = self._fetch(session, url, timeout=15)
                     print(f"MarketWatch {url}: {response.status_code}")
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Look for news articles with various selectors
-                        selectors = [
-                            'h3.article__headline a',
-                            'h2.article__headline a', 
-                            'a[class*="headline"]',
-                            'div[class*="article"] h3 a',
-                            'div[class*="news"] a',
-                            'a[href*="/story/"]',
-                            'h3 a[href*="marketwatch.com"]'
-                        ]
+                        # One pass over the page collects headline links and a symbol paragraph
+                        page = self.parse_pool.listing(response.content, 'marketwatch', stock_symbol)
                         
-                        for selector in selectors:
-                            links = soup.select(selector)
-                            for link in links[:3]:
-                                try:
-                                    title = link.get_text().strip()
-                                    href = link.get('href', '')
-                                    
-                                    if len(title) > 25 and href:
-                                        article_url = href if href.startswith('http') else f"https://www.marketwatch.com{href}"
-                                        
-                                        # Get article content
-                                        content = self._get_article_content(article_url, session)
-                                        
-                                        articles.append({
-                                            'title': title,
-                                            'content': content or title,
-                                            'url': article_url,
-                                            'source': 'MarketWatch',
-                                            'timestamp': datetime.now().isoformat()
-                                        })
-                                except Exception:
-                                    continue
+                        # Fetch the linked article bodies concurrently
+                        articles.extend(self._build_linked_articles(page['links'], session, 'MarketWatch'))
                         
-                        # Look for any relevant text content about the stock
-                        text_content = soup.get_text()
-                        if stock_symbol in text_content:
-                            # Find sections that mention the stock
-                            for section in soup.find_all(['div', 'section', 'article']):
-                                section_text = section.get_text()
-                                if stock_symbol in section_text and len(section_text) > 100:
-                                    # Extract meaningful paragraphs
-                                    paragraphs = section.find_all('p')
-                                    for p in paragraphs:
-                                        text = p.get_text().strip()
-                                        if len(text) > 50 and stock_symbol in text:
-                                            articles.append({
-                                                'title': f'{stock_symbol} MarketWatch Analysis',
-                                                'content': text[:400],
-                                                'url': url,
-                                                'source': 'MarketWatch',
-                                                'timestamp': datetime.now().isoformat()
-                                            })
-                                            break
-                                    break
+                        # Paragraph from the first section that mentions the stock
+                        if page['paragraph']:
+                            articles.append({
+                                'title': f'{stock_symbol} MarketWatch Analysis',
+                                'content': page['paragraph'][:400],
+                                'url': url,
+                                'source': 'MarketWatch',
+                                'timestamp': datetime.now().isoformat()
+                            })
                         
                         if articles:
                             break
@@ -251,8 +376,6 @@ class StockRAGSystem:
         """Scrape Seeking Alpha for stock analysis"""
         articles = []
         try:
-            time.sleep(3)  # Seeking Alpha might be more strict
-            
             # Try multiple Seeking Alpha URLs
             urls = [
                 f"https://seekingalpha.com/symbol/{stock_symbol}/analysis",
@@ -261,82 +384,29 @@ class StockRAGSystem:
                 f"https://seekingalpha.com/search?q={stock_symbol}"
             ]
             
-            session = requests.Session()
-            # Use more realistic headers for Seeking Alpha
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Referer': 'https://www.google.com/',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
+            session = self.seeking_alpha_session
             
             for url in urls:
                 try:
-                    response = session.get(url, timeout=15)
+                    response = self._fetch(session, url, timeout=15)
                     print(f"Seeking Alpha {url}: {response.status_code}")
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Look for articles with various selectors
-                        selectors = [
-                            'a[data-test-id*="post-list"]',
-                            'article h2 a',
-                            'h3 a[href*="/article/"]',
-                            'div[class*="article"] a',
-                            'a[href*="/news/"]',
-                            'h2 a[href*="seekingalpha.com"]',
-                            'div[class*="title"] a'
-                        ]
+                        # One pass over the page collects headline links and a symbol paragraph
+                        page = self.parse_pool.listing(response.content, 'seeking_alpha', stock_symbol)
                         
-                        for selector in selectors:
-                            links = soup.select(selector)
-                            for link in links[:3]:
-                                try:
-                                    title = link.get_text().strip()
-                                    href = link.get('href', '')
-                                    
-                                    if len(title) > 20 and href:
-                                        article_url = href if href.startswith('http') else f"https://seekingalpha.com{href}"
-                                        
-                                        # Get article content
-                                        content = self._get_article_content(article_url, session)
-                                        
-                                        articles.append({
-                                            'title': title,
-                                            'content': content or title,
-                                            'url': article_url,
-                                            'source': 'Seeking Alpha',
-                                            'timestamp': datetime.now().isoformat()
-                                        })
-                                except Exception:
-                                    continue
+                        # Fetch the linked article bodies concurrently
+                        articles.extend(self._build_linked_articles(page['links'], session, 'Seeking Alpha'))
                         
-                        # Look for stock analysis content in the page
-                        text_content = soup.get_text()
-                        if stock_symbol in text_content:
-                            # Look for analysis sections
-                            for section in soup.find_all(['div', 'section', 'article']):
-                                section_text = section.get_text()
-                                if stock_symbol in section_text and any(word in section_text.lower() for word in ['analysis', 'outlook', 'investment', 'recommendation']):
-                                    # Extract meaningful content
-                                    paragraphs = section.find_all('p')
-                                    for p in paragraphs:
-                                        text = p.get_text().strip()
-                                        if len(text) > 80 and stock_symbol in text:
-                                            articles.append({
-                                                'title': f'{stock_symbol} Investment Analysis - Seeking Alpha',
-                                                'content': text[:400],
-                                                'url': url,
-                                                'source': 'Seeking Alpha',
-                                                'timestamp': datetime.now().isoformat()
-                                            })
-                                            break
-                                    break
+                        # Paragraph from the first analysis section that mentions the stock
+                        if page['paragraph']:
+                            articles.append({
+                                'title': f'{stock_symbol} Investment Analysis - Seeking Alpha',
+                                'content': page['paragraph'][:400],
+                                'url': url,
+                                'source': 'Seeking Alpha',
+                                'timestamp': datetime.now().isoformat()
+                            })
                         
                         if articles:
                             break
@@ -353,19 +423,11 @@ class StockRAGSystem:
     def _extract_article_content(self, url: str, source: str) -> str:
         """Extract content from article URL"""
         try:
+            self.rate_limiter.acquire(url, borrow=not BACKGROUND_FETCH.get())
             response = requests.get(url, headers=self.headers, timeout=10)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Remove unwanted elements
-                for element in soup(['script', 'style', 'nav', 'header', 'footer']):
-                    element.decompose()
-                
-                # Extract paragraphs
-                paragraphs = soup.find_all('p')
-                content = ' '.join([p.get_text().strip() for p in paragraphs[:3]])  # First 3 paragraphs
-                
-                return content[:500] if content else None  # Limit content length
+                # First 3 paragraphs, limited to 500 characters
+                return self.parse_pool.article(response.content, PLAIN_ARTICLE_SPEC)
                 
         except Exception:
             return None
@@ -376,143 +438,105 @@ class StockRAGSystem:
         
         print(f"Scraping news for {stock_symbol}...")
         
-        # Scrape from all sources
-        yahoo_articles = self.scrape_yahoo_finance(stock_symbol)
-        time.sleep(1)  # Be respectful to servers
-        
-        marketwatch_articles = self.scrape_marketwatch(stock_symbol)
-        time.sleep(1)
-        
-        seeking_alpha_articles = self.scrape_seeking_alpha(stock_symbol)
-        
-        # Combine all articles
-        all_articles.extend(yahoo_articles)
-        all_articles.extend(marketwatch_articles)
-        all_articles.extend(seeking_alpha_articles)
+        # Scrape all sources concurrently; the per-host rate limiter keeps us
+        # respectful to each server without serializing unrelated domains
+        scrapers = [self.scrape_yahoo_finance, self.scrape_marketwatch, self.scrape_seeking_alpha]
+        with ThreadPoolExecutor(max_workers=len(scrapers)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, scraper, stock_symbol) for scraper in scrapers]
+            
+            # Combine all articles, keeping the original source order
+            for future in futures:
+                all_articles.extend(future.result())
         
         # Remove duplicates based on title similarity
         unique_articles = self._remove_duplicate_articles(all_articles)
         
+        # Map stories seen before under another URL to the article we already have
+        if self.headline_index:
+            unique_articles = self.headline_index.canonicalize(unique_articles)
+        
         print(f"Found {len(unique_articles)} unique articles")
         return unique_articles
     
     def _remove_duplicate_articles(self, articles: List[Dict]) -> List[Dict]:
-        """Remove duplicate articles based on title similarity"""
-        unique_articles = []
-        seen_titles = set()
-        
-        for article in articles:
-            # Create a normalized version of the title for comparison
-            normalized_title = re.sub(r'[^a-zA-Z0-9\s]', '', article['title'].lower())
-            title_words = set(normalized_title.split())
-            # Check if this title is too similar to any we've seen
-            is_duplicate = False
-            for seen_title in seen_titles:
-                seen_words = set(seen_title.split())
-                if len(title_words.intersection(seen_words)) / len(title_words.union(seen_words)) > 0.7:
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                seen_titles.add(normalized_title)
-                unique_articles.append(article)
-        
-        return unique_articles
+        """Remove duplicate articles based on title similarity (MinHash/LSH, Jaccard > 0.7)"""
+        return remove_near_duplicates(articles, threshold=0.7)
     
-    def build_vector_index(self, documents: List[Dict]):
-        """Build FAISS vector index from documents"""
-        self.documents = documents
+    def build_vector_index(self, documents: List[Dict], stock_symbol: str = None) -> AnalysisContext:
+        """Build a FAISS vector index from documents
+        
+        With a stock symbol and the persistent symbol index enabled, only unseen
+        documents are encoded and added to that symbol's index; otherwise a
+        throwaway per-request index is built.
+        """
+        if stock_symbol and self.symbol_index:
+            count = self.symbol_index.update(stock_symbol, documents, self._encode_texts)
+            return AnalysisContext(documents, symbol=stock_symbol, document_count=count)
+        
+        context = AnalysisContext(documents)
         
         if not documents:
-            return
+            return context
             
         # Extract text content for embedding
         texts = [f"{doc['title']} {doc['content']}" for doc in documents]
         
         # Generate embeddings
-        embeddings = self.embedding_model.encode(texts)
+        embeddings = self._encode_texts(texts)
         
         # Build FAISS index
         dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product for similarity
+        context.index = faiss.IndexFlatIP(dimension)  # Inner product for similarity
         
         # Normalize embeddings for cosine similarity
+        embeddings = embeddings.astype('float32')
         faiss.normalize_L2(embeddings)
-        self.index.add(embeddings.astype('float32'))
+        context.index.add(embeddings)
+        return context
     
-    def retrieve_relevant_docs(self, query: str, k: int = 8) -> List[Dict]:
-        """Retrieve most relevant documents for a query"""
-        if not self.index or not self.documents:
-            return []
+    def retrieve_relevant_docs(self, context: AnalysisContext, query: str, k: int = 8, return_embeddings: bool = False):
+        """Retrieve most relevant documents for a query from a request's context
+        
+        With return_embeddings, returns (documents, their normalized vectors) so
+        callers can reuse the vectors without encoding the documents again.
+        """
+        if context.symbol is None and (context.index is None or not context.documents):
+            return ([], np.empty((0, self.embedding_model.get_sentence_embedding_dimension()), dtype='float32')) if return_embeddings else []
             
         # Encode query
-        query_embedding = self.embedding_model.encode([query])
+        query_embedding = self._encode_texts([query])
         faiss.normalize_L2(query_embedding)
         
+        if context.symbol is not None:
+            return self.symbol_index.search(context.symbol, query_embedding, k, return_embeddings=return_embeddings)
+        
         # Search
-        scores, indices = self.index.search(query_embedding.astype('float32'), k)
+        scores, indices = context.index.search(query_embedding.astype('float32'), k)
         
         # Return relevant documents
         relevant_docs = []
+        positions = []
         for i, idx in enumerate(indices[0]):
-            if idx < len(self.documents):
-                doc = self.documents[idx].copy()
+            if 0 <= idx < len(context.documents):
+                doc = context.documents[idx].copy()
                 doc['relevance_score'] = float(scores[0][i])
                 relevant_docs.append(doc)
+                positions.append(int(idx))
         
+        if return_embeddings:
+            return relevant_docs, np.array([context.index.reconstruct(idx) for idx in positions], dtype='float32').reshape(len(positions), context.index.d)
         return relevant_docs
     
-    def categorize_documents(self, documents: List[Dict]) -> Dict[str, List[Dict]]:
-        """Categorize documents into different sections based on content analysis"""
-        categories = {
-            'expert_analysis': [],
-            'company_news': [],
-            'financial_performance': [],
-            'market_sentiment': [],
-            'risk_assessment': []
-        }
+    def categorize_documents(self, documents: List[Dict], embeddings: np.ndarray = None) -> Dict[str, List[Dict]]:
+        """Categorize documents into different sections based on content analysis
         
-        for doc in documents:
-            content_lower = f"{doc['title']} {doc['content']}".lower()
-            
-            # Keywords for each category
-            expert_keywords = ['analysis', 'recommendation', 'outlook', 'investment', 'target price', 'rating', 'upgrade', 'downgrade', 'analyst', 'forecast']
-            news_keywords = ['announced', 'launch', 'partnership', 'acquisition', 'merger', 'ceo', 'executive', 'product', 'service', 'expansion']
-            financial_keywords = ['earnings', 'revenue', 'profit', 'loss', 'eps', 'quarterly', 'financial results', 'sales', 'income', 'margin']
-            sentiment_keywords = ['bullish', 'bearish', 'optimistic', 'pessimistic', 'confidence', 'sentiment', 'mood', 'outlook', 'expectations']
-            risk_keywords = ['risk', 'concern', 'challenge', 'threat', 'volatility', 'uncertainty', 'decline', 'drop', 'fall', 'warning']
-            
-            # Score each category
-            scores = {
-                'expert_analysis': sum(1 for keyword in expert_keywords if keyword in content_lower),
-                'company_news': sum(1 for keyword in news_keywords if keyword in content_lower),
-                'financial_performance': sum(1 for keyword in financial_keywords if keyword in content_lower),
-                'market_sentiment': sum(1 for keyword in sentiment_keywords if keyword in content_lower),
-                'risk_assessment': sum(1 for keyword in risk_keywords if keyword in content_lower)
-            }
-            
-            # Assign to category with highest score, or default to company_news
-            best_category = max(scores.items(), key=lambda x: x[1])
-            if best_category[1] > 0:
-                categories[best_category[0]].append(doc)
-            else:
-                categories['company_news'].append(doc)  # Default category
-        
-        return categories
+        The embedding categorizer uses the documents' normalized vectors when
+        given; the keyword categorizer ignores them.
+        """
+        return self.categorizer.categorize(documents, embeddings)
 
-    def generate_categorized_analysis(self, stock_symbol: str, categorized_docs: Dict[str, List[Dict]], quant_data: Dict = None) -> Dict[str, str]:
-        """Generate analysis for each category, incorporating quantitative data where relevant"""
-        analyses = {}
-        sources_used = set()
-        
-        # Collect all sources used
-        for category_docs in categorized_docs.values():
-            for doc in category_docs:
-                sources_used.add(doc['source'])
-        
-        sources_list = ", ".join(sources_used)
-        
-        # Prepare quantitative context
+    def _build_quant_context(self, stock_symbol: str, quant_data: Dict = None) -> str:
+        """Format quantitative metrics for inclusion in LLM prompts"""
         quant_context = ""
         if quant_data:
             quant_context = f"""
@@ -526,8 +550,21 @@ class StockRAGSystem:
             - Dividend Yield: {quant_data['dividend_yield']:.2f}%
             - Sector/Industry: {quant_data['sector']} / {quant_data['industry']}
             """
-        
-        # Category configurations
+            indicators = quant_data.get('indicators')
+            if indicators:
+                def fmt(value, suffix=''):
+                    return 'N/A' if value is None else f"{value}{suffix}"
+                quant_context += f"""Technical Indicators:
+            - Moving Averages: 20-day {fmt(indicators['sma_20'])}, 50-day {fmt(indicators['sma_50'])}
+            - RSI (14): {fmt(indicators['rsi_14'])}
+            - MACD: {fmt(indicators['macd'])} (signal {fmt(indicators['macd_signal'])}, histogram {fmt(indicators['macd_histogram'])})
+            - 20-Day Volatility: {fmt(indicators['volatility_20d'], '%')} (annualized)
+            - Max Drawdown (1y): {fmt(indicators['max_drawdown'], '%')}
+            """
+        return quant_context
+    
+    def _build_category_configs(self, stock_symbol: str, quant_context: str) -> Dict[str, Dict]:
+        """Titles, icons and prompts for each analysis category"""
         category_configs = {
             'expert_analysis': {
                 'title': 'Expert Analysis & Outlook',
@@ -555,108 +592,373 @@ class StockRAGSystem:
                 'icon': '⚠️'
             }
         }
+        return category_configs
+    
+    def _category_messages(self, config: Dict, docs: List[Dict]) -> List[Dict]:
+        """Build the chat messages for a single category"""
+        # Prepare context from relevant documents
+        context = ""
+        for doc in docs:
+            context += f"Source: {doc['source']}\nHeadline: {doc['title']}\nContent: {doc['content']}\n\n"
         
-        for category, docs in categorized_docs.items():
-            if not docs:
-                continue
-                
-            # Prepare context from relevant documents
-            context = ""
-            for doc in docs:
-                context += f"Source: {doc['source']}\nHeadline: {doc['title']}\nContent: {doc['content']}\n\n"
-            
-            config = category_configs[category]
-            prompt = f"""
-            {config['prompt']}
-            
-            Recent Information:
-            {context}
-            
-            Write a focused analysis (150-200 words) that synthesizes both the news information and quantitative data for this specific category. Include specific data points, quotes, and insights from the sources. Reference both news sources and quantitative metrics naturally within the text.
+        prompt = f"""
+        {config['prompt']}
+        
+        Recent Information:
+        {context}
+        
+        Write a focused analysis (150-200 words) that synthesizes both the news information and quantitative data for this specific category. Include specific data points, quotes, and insights from the sources. Reference both news sources and quantitative metrics naturally within the text.
+        
+        Analysis:
+        """
+        
+        return [
+            {"role": "system", "content": f"You are a professional financial analyst providing objective analysis based on recent news and quantitative data. Focus on the specific category: {config['title']}."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _category_cache_key(self, stock_symbol: str, category: str, config: Dict, docs: List[Dict], quant_data: Dict) -> str:
+        """Completion cache key for one category's analysis, or None when the cache is off"""
+        if not self.llm_cache:
+            return None
+        system_prompt = self._category_messages(config, [])[0]['content']
+        return self.llm_cache.key(LLM_MODEL, system_prompt, [document_id(doc) for doc in docs], quant_snapshot(quant_data),
+                                  symbol=stock_symbol, category=category)
+    
+    def _combined_cache_key(self, stock_symbol: str, categorized_docs: Dict[str, List[Dict]], quant_data: Dict) -> str:
+        """Completion cache key for the single-call analysis of all categories, or None when the cache is off"""
+        if not self.llm_cache:
+            return None
+        layout = {category: sorted(document_id(doc) for doc in docs) for category, docs in categorized_docs.items()}
+        return self.llm_cache.key(LLM_MODEL, COMBINED_SYSTEM_PROMPT, [doc_id for ids in layout.values() for doc_id in ids],
+                                  quant_snapshot(quant_data), symbol=stock_symbol, layout=layout)
+    
+    def _cached_completion(self, cache_key: str):
+        """Completion from the LLM cache, or None on a miss; cache errors are logged and treated as misses"""
+        if not cache_key:
+            return None
+        try:
+            return self.llm_cache.get(cache_key)
+        except Exception as e:
+            print(f"Error reading LLM cache: {e}")
+            return None
+    
+    def _cache_completion(self, cache_key: str, value):
+        """Store a completion in the LLM cache; a failure here never fails the analysis"""
+        if not cache_key:
+            return
+        try:
+            self.llm_cache.put(cache_key, value)
+        except Exception as e:
+            print(f"Error writing LLM cache: {e}")
+    
+    def _generate_category_analysis(self, config: Dict, docs: List[Dict], cache_key: str = None) -> Dict:
+        """Make one LLM call for a single category, answering from the completion cache when possible"""
+        cached = self._cached_completion(cache_key)
+        if cached is not None:
+            return {'title': config['title'], 'icon': config['icon'], 'content': cached}
+        
+        try:
+            response = self.openai_client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=self._category_messages(config, docs),
+                max_tokens=250,
+                temperature=0.6,
+                timeout=self.llm_timeout
+            )
             
-            Analysis:
-            """
+            analysis = response.choices[0].message.content.strip()
             
-            try:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": f"You are a professional financial analyst providing objective analysis based on recent news and quantitative data. Focus on the specific category: {config['title']}."},
-                        {"role": "user", "content": prompt}
-                    ],
+        except Exception as e:
+            return {
+                'title': config['title'],
+                'icon': config['icon'],
+                'content': f"{CATEGORY_ERROR_PREFIX}: {str(e)}"
+            }
+        
+        self._cache_completion(cache_key, analysis)
+        return {
+            'title': config['title'],
+            'icon': config['icon'],
+            'content': analysis
+        }
+    
+    def _stream_category_analysis(self, category: str, config: Dict, docs: List[Dict], emit, cache_key: str = None):
+        """Token-stream one category's analysis, reporting progress through emit(event, data)
+        
+        A cached completion is emitted as a single delta. Always ends with a
+        'category' event, carrying an error message if anything failed.
+        """
+        emit('category_start', {'category': category, 'title': config['title'], 'icon': config['icon']})
+        content = ""
+        try:
+            cached = self._cached_completion(cache_key)
+            if cached is not None:
+                content = cached
+                emit('category_delta', {'category': category, 'delta': cached})
+            else:
+                stream = self.openai_client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=self._category_messages(config, docs),
                     max_tokens=250,
-                    temperature=0.6
+                    temperature=0.6,
+                    timeout=self.llm_timeout,
+                    stream=True
                 )
-                
-                analysis = response.choices[0].message.content.strip()
-                analyses[category] = {
-                    'title': config['title'],
-                    'icon': config['icon'],
-                    'content': analysis
-                }
-                
-            except Exception as e:
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        content += delta
+                        emit('category_delta', {'category': category, 'delta': delta})
+                content = content.strip()
+                self._cache_completion(cache_key, content)
+        except Exception as e:
+            content = f"{CATEGORY_ERROR_PREFIX}: {str(e)}"
+        
+        emit('category', {'category': category, 'title': config['title'], 'icon': config['icon'], 'content': content})
+    
+    def _generate_combined_analysis(self, stock_symbol: str, categorized_docs: Dict[str, List[Dict]], quant_context: str, cache_key: str = None) -> Dict[str, Dict]:
+        """Generate every category in one structured LLM call, returning only the categories it produced"""
+        focus_configs = self._build_category_configs(stock_symbol, "")
+        cached = self._cached_completion(cache_key)
+        if cached is not None:
+            return {category: dict(analysis) for category, analysis in cached.items()}
+        
+        sections = ""
+        for category, docs in categorized_docs.items():
+            context = ""
+            for doc in docs:
+                context += f"Source: {doc['source']}\nHeadline: {doc['title']}\nContent: {doc['content']}\n\n"
+            sections += f"### {category} ({focus_configs[category]['title']})\nFocus: {focus_configs[category]['prompt']}\n\nRecent Information:\n{context}\n"
+        
+        prompt = f"""
+        {quant_context}
+        
+        The recent information about {stock_symbol} below is grouped by analysis category.
+        
+        {sections}
+        For each category, write a focused analysis (150-200 words) that synthesizes both the news information and quantitative data for that category. Include specific data points, quotes, and insights from the sources. Reference both news sources and quantitative metrics naturally within the text.
+        
+        Respond with a JSON object whose keys are exactly: {", ".join(categorized_docs.keys())}. Each value must be the analysis text for that category.
+        """
+        
+        try:
+            response = self.openai_client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": COMBINED_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=250 * len(categorized_docs),
+                temperature=0.6,
+                response_format={"type": "json_object"},
+                timeout=self.llm_timeout
+            )
+            parsed = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Error generating combined analysis: {e}")
+            return {}
+        
+        if not isinstance(parsed, dict):
+            return {}
+        
+        analyses = {}
+        for category in categorized_docs:
+            analysis = parsed.get(category)
+            if isinstance(analysis, str) and analysis.strip():
                 analyses[category] = {
-                    'title': config['title'],
-                    'icon': config['icon'],
-                    'content': f"Error generating analysis for this category: {str(e)}"
+                    'title': focus_configs[category]['title'],
+                    'icon': focus_configs[category]['icon'],
+                    'content': analysis.strip()
                 }
+        if analyses:
+            self._cache_completion(cache_key, analyses)
+        return analyses
+    
+    def _sources_list(self, categorized_docs: Dict[str, List[Dict]]) -> str:
+        """Comma-separated names of every source feeding the analysis"""
+        sources_used = set()
+        
+        # Collect all sources used
+        for category_docs in categorized_docs.values():
+            for doc in category_docs:
+                sources_used.add(doc['source'])
+        
+        return ", ".join(sources_used)
+    
+    def _reusable_analyses(self, stock_symbol: str, pending: Dict[str, List[Dict]], quant_data: Dict) -> Dict[str, Dict]:
+        """Previous analyses of the categories whose documents and material quant fields are unchanged"""
+        if self.analysis_memory is None:
+            return {}
+        return self.analysis_memory.reusable(stock_symbol, pending, quant_data)
+    
+    def _remember_analyses(self, stock_symbol: str, pending: Dict[str, List[Dict]], quant_data: Dict, analyses: Dict[str, Dict]):
+        """Record newly generated category analyses, skipping failed ones"""
+        if self.analysis_memory is None:
+            return
+        generated = {category: analysis for category, analysis in analyses.items()
+                     if category in pending and not analysis['content'].startswith(CATEGORY_ERROR_PREFIX)}
+        self.analysis_memory.remember(stock_symbol, pending, quant_data, generated)
+    
+    def generate_categorized_analysis(self, stock_symbol: str, categorized_docs: Dict[str, List[Dict]], quant_data: Dict = None, mode: str = None) -> Dict[str, str]:
+        """Generate analysis for each category, incorporating quantitative data where relevant
+        
+        mode is 'per_category' (one LLM call per category) or 'single' (one structured
+        call for all categories, falling back to per-category calls for missing keys).
+        Categories whose evidence is unchanged since the last analysis of the symbol
+        are reused and marked with 'reused' and their original 'generated_at'.
+        """
+        mode = mode or self.analysis_mode
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        
+        analyses = {}
+        sources_list = self._sources_list(categorized_docs)
+        
+        quant_context = self._build_quant_context(stock_symbol, quant_data)
+        category_configs = self._build_category_configs(stock_symbol, quant_context)
+        
+        pending = {category: docs for category, docs in categorized_docs.items() if docs}
+        reused = self._reusable_analyses(stock_symbol, pending, quant_data)
+        stale = {category: docs for category, docs in pending.items() if category not in reused}
+        
+        combined = {}
+        if mode == 'single' and stale:
+            combined = self._generate_combined_analysis(stock_symbol, stale, quant_context,
+                                                        self._combined_cache_key(stock_symbol, stale, quant_data))
+        
+        # Issue the remaining per-category LLM calls concurrently; the shared pool
+        # caps how many are in flight across all requests
+        futures = {
+            category: self.llm_executor.submit(self._generate_category_analysis, category_configs[category], docs,
+                                               self._category_cache_key(stock_symbol, category, category_configs[category], docs, quant_data))
+            for category, docs in stale.items() if category not in combined
+        }
+        for category in pending:
+            if category in reused:
+                analyses[category] = reused[category]
+            else:
+                analyses[category] = combined[category] if category in combined else futures[category].result()
+        self._remember_analyses(stock_symbol, stale, quant_data, analyses)
         
         analyses['sources'] = sources_list
         return analyses
     
     def get_quantitative_data(self, stock_symbol: str) -> Dict:
-        """Get quantitative stock data using yfinance"""
-        try:
-            ticker = yf.Ticker(stock_symbol)
-            info = ticker.info
-            hist = ticker.history(period="1y")
-            
-            if hist.empty:
-                return None
-                
-            current_price = hist['Close'].iloc[-1] if not hist.empty else info.get('currentPrice', 0)
-            
-            # Calculate metrics
-            volatility = hist['Close'].pct_change().std() * np.sqrt(252) * 100  # Annualized volatility
-            volume_avg = hist['Volume'].mean()
-            price_change_1d = ((hist['Close'].iloc[-1] - hist['Close'].iloc[-2]) / hist['Close'].iloc[-2] * 100) if len(hist) > 1 else 0
-            
-            # 52-week high/low
-            week_52_high = hist['High'].max()
-            week_52_low = hist['Low'].min()
-            
-            # Calculate percentage from 52-week high/low
-            pct_from_high = ((current_price - week_52_high) / week_52_high * 100)
-            pct_from_low = ((current_price - week_52_low) / week_52_low * 100)
-            
+        """Get quantitative stock data using yfinance (cached)"""
+        return self.quant_data.get(stock_symbol)
+    
+    def get_quantitative_data_batch(self, stock_symbols: List[str]) -> Dict[str, Dict]:
+        """Get quantitative data for many symbols with one multi-ticker history download"""
+        return self.quant_data.get_many(stock_symbols)
+    
+    def screen_universe(self, stock_symbols: List[str], sort_by: str = 'pct_from_high', descending: bool = False,
+                        filters: Dict = None, limit: int = None) -> List[Dict]:
+        """Compute quant metrics for a whole universe in one vectorized pass, then filter and sort it"""
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in stock_symbols))
+        bars = self.quant_data.get_bars_many(symbols)
+        empty = {column: np.empty(0) for column in ('close', 'high', 'low', 'volume')}
+        matrices = stack_bars({symbol: bars.get(symbol) or empty for symbol in symbols})
+        metrics = compute_universe_metrics(matrices['close'], matrices['high'], matrices['low'], matrices['volume'])
+        return screen(symbols, metrics, sort_by=sort_by, descending=descending, filters=filters, limit=limit)
+    
+    def _retrieve_and_categorize(self, stock_symbol: str, news_articles: List[Dict]) -> tuple:
+        """Index the articles, retrieve the most relevant ones and group them by category
+        
+        Returns (relevant docs, docs by category, number of documents searched). With the
+        persistent symbol index that count includes articles kept from earlier requests.
+        """
+        # Build vector index
+        context = self.build_vector_index(news_articles, stock_symbol)
+        
+        # Retrieve relevant documents
+        query = f"{stock_symbol} stock financial analysis market performance earnings revenue"
+        relevant_docs, embeddings = self.retrieve_relevant_docs(context, query, k=min(context.document_count, 12), return_embeddings=True)
+        
+        # Categorize documents, reusing their vectors
+        return relevant_docs, self.categorize_documents(relevant_docs, embeddings), context.document_count
+    
+    def _cached_result(self, stock_symbol: str, analysis_mode: str) -> Dict:
+        """Cached analyze_stock result with its age, refreshing it in the background when stale"""
+        if self.result_cache is None:
+            return None
+        key = ResultCache.key(stock_symbol, analysis_mode)
+        cached = self.result_cache.get(key)
+        if cached is None:
+            return None
+        result, age, stale = cached
+        if stale:
+            self.result_cache.revalidate(key, lambda: self._compute_result(stock_symbol, analysis_mode))
+        return dict(result, age_seconds=int(age), stale=stale)
+    
+    def _store_result(self, stock_symbol: str, analysis_mode: str, result: Dict) -> Dict:
+        """Cache a successful result and return it marked as just computed
+        
+        Results with a failed category (e.g. an OpenAI timeout) are not cached, so
+        the next request retries instead of serving the error for hours.
+        """
+        failed = any(isinstance(analysis, dict) and analysis['content'].startswith(CATEGORY_ERROR_PREFIX)
+                     for analysis in result.get('categories', {}).values())
+        if self.result_cache is not None and result.get('success') and not failed:
+            self.result_cache.put(ResultCache.key(stock_symbol, analysis_mode), result)
+        return dict(result, age_seconds=0, stale=False)
+    
+    def _compute_result(self, stock_symbol: str, analysis_mode: str) -> Dict:
+        """Run the pipeline and cache its result, sharing one run among concurrent identical requests"""
+        result = self.single_flight.do(
+            ResultCache.key(stock_symbol, analysis_mode),
+            lambda: self._store_result(stock_symbol, analysis_mode, self._run_analysis(stock_symbol, analysis_mode))
+        )
+        return dict(result)
+    
+    def _busy_error(self, stock_symbol: str) -> str:
+        return f"An analysis of {stock_symbol} is already running and taking longer than expected. Please try again shortly."
+    
+    def analyze_stock(self, stock_symbol: str, analysis_mode: str = None) -> Dict:
+        """Main method to analyze a stock symbol with categorized analysis
+        
+        Results come from the result cache when available; age_seconds tells how
+        long ago the returned result was computed and stale whether a refresh is
+        under way. Concurrent requests for the same symbol and mode wait on a
+        single run of the pipeline.
+        """
+        # One spelling per ticker for the symbol index, caches and coalescing keys
+        stock_symbol = stock_symbol.upper()
+        analysis_mode = analysis_mode or self.analysis_mode
+        if analysis_mode not in ANALYSIS_MODES:
             return {
-                'current_price': round(current_price, 2),
-                'price_change_1d': round(price_change_1d, 2),
-                'volatility': round(volatility, 2),
-                'volume_avg': int(volume_avg),
-                'week_52_high': round(week_52_high, 2),
-                'week_52_low': round(week_52_low, 2),
-                'pct_from_high': round(pct_from_high, 2),
-                'pct_from_low': round(pct_from_low, 2),
-                'market_cap': info.get('marketCap', 'N/A'),
-                'pe_ratio': info.get('forwardPE', info.get('trailingPE', 'N/A')),
-                'dividend_yield': info.get('dividendYield', 0) * 100 if info.get('dividendYield') else 0,
-                'beta': info.get('beta', 'N/A'),
-                'eps': info.get('trailingEps', 'N/A'),
-                'book_value': info.get('bookValue', 'N/A'),
-                'debt_to_equity': info.get('debtToEquity', 'N/A'),
-                'roe': info.get('returnOnEquity', 0) * 100 if info.get('returnOnEquity') else 'N/A',
-                'sector': info.get('sector', 'N/A'),
-                'industry': info.get('industry', 'N/A'),
-                'company_name': info.get('longName', stock_symbol)
+                'success': False,
+                'error': f"Unknown analysis mode '{analysis_mode}'. Use one of: {', '.join(ANALYSIS_MODES)}"
             }
-        except Exception as e:
-            print(f"Error fetching quantitative data: {e}")
-            return None
-
-    def analyze_stock(self, stock_symbol: str) -> Dict:
-        """Main method to analyze a stock symbol with categorized analysis"""
+        
+        cached = self._cached_result(stock_symbol, analysis_mode)
+        if cached is not None:
+            return cached
+        try:
+            return self._compute_result(stock_symbol, analysis_mode)
+        except SingleFlightTimeout:
+            return {'success': False, 'error': self._busy_error(stock_symbol)}
+    
+    def refresh_symbol(self, stock_symbol: str, analysis_mode: str = None, min_fresh: float = 60) -> bool:
+        """Precompute a symbol's analysis ahead of demand, warming the quant, index, LLM and result caches
+        
+        Skipped while the cached result stays fresh for more than min_fresh seconds.
+        Its scrapes never borrow rate-limiter tokens, so they queue behind user requests.
+        Returns whether the pipeline ran.
+        """
+        stock_symbol = stock_symbol.upper()
+        analysis_mode = analysis_mode or self.analysis_mode
+        if self.result_cache is not None and self.result_cache.fresh_for(ResultCache.key(stock_symbol, analysis_mode)) > min_fresh:
+            return False
+        token = BACKGROUND_FETCH.set(True)
+        try:
+            self._compute_result(stock_symbol, analysis_mode)
+        finally:
+            BACKGROUND_FETCH.reset(token)
+        return True
+    
+    def _run_analysis(self, stock_symbol: str, analysis_mode: str) -> Dict:
+        """Run the full pipeline for one symbol, bypassing the result cache"""
         # Step 1: Get quantitative data
         quant_data = self.get_quantitative_data(stock_symbol)
         
@@ -669,27 +971,269 @@ class StockRAGSystem:
                 'error': f"No data found for {stock_symbol}. Please check the stock symbol and try again."
             }
         
-        # Step 3: Build vector index (only if we have news)
+        # Steps 3-5: Index, retrieve and categorize (only if we have news)
         if news_articles:
-            self.build_vector_index(news_articles)
+            relevant_docs, categorized_docs, searched = self._retrieve_and_categorize(stock_symbol, news_articles)
+        else:
+            relevant_docs, categorized_docs, searched = [], {}, 0
+        
+        # Step 6: Generate categorized analysis
+        return self._finish_analysis(stock_symbol, quant_data, news_articles, relevant_docs, categorized_docs, analysis_mode, searched)
+    
+    def _finish_analysis(self, stock_symbol: str, quant_data: Dict, news_articles: List[Dict], relevant_docs: List[Dict],
+                         categorized_docs: Dict[str, List[Dict]], analysis_mode: str, searched: int = None) -> Dict:
+        """Generate the categorized analysis and assemble the analyze_stock result
+        
+        total_articles is the number of documents retrieval searched (searched, or the fetched
+        articles when not given), so it is never smaller than relevant_articles.
+        """
+        categorized_analysis = {}
+        if news_articles:
+            categorized_analysis = self.generate_categorized_analysis(stock_symbol, categorized_docs, quant_data, mode=analysis_mode)
+        
+        return {
+            'success': True,
+            'quantitative_data': quant_data,
+            'categories': categorized_analysis,
+            'total_articles': (len(news_articles) if news_articles else 0) if searched is None else searched,
+            'relevant_articles': len(relevant_docs),
+            'analysis_mode': analysis_mode
+        }
+    
+    def analyze_stock_stream(self, stock_symbol: str, analysis_mode: str = None):
+        """Run the analysis pipeline, yielding (event, data) pairs as each stage completes
+        
+        Events: start, quant, articles, category_start, category_delta, category, done
+        (or error). The final done event carries the same result as analyze_stock; a
+        cached result, or the result of an identical analysis already running, is
+        replayed as quant, articles and category events.
+        """
+        stock_symbol = stock_symbol.upper()
+        analysis_mode = analysis_mode or self.analysis_mode
+        if analysis_mode not in ANALYSIS_MODES:
+            yield 'error', {'error': f"Unknown analysis mode '{analysis_mode}'. Use one of: {', '.join(ANALYSIS_MODES)}"}
+            return
+        
+        yield 'start', {'symbol': stock_symbol}
+        
+        cached = self._cached_result(stock_symbol, analysis_mode)
+        if cached is not None:
+            yield from self._replay_result(cached)
+            return
+        
+        # Join an identical analysis that is already running instead of starting another
+        key = ResultCache.key(stock_symbol, analysis_mode)
+        call, leader = self.single_flight.acquire(key)
+        if not leader:
+            try:
+                result = self.single_flight.wait(key, call)
+            except SingleFlightTimeout:
+                yield 'error', {'error': self._busy_error(stock_symbol)}
+                return
+            yield from self._replay_result(dict(result))
+            return
+        
+        # The run owns the shared call and finishes even if this client disconnects;
+        # the stream only relays its events
+        events = self._start_stream_run(stock_symbol, analysis_mode, key, call)
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            yield item
+    
+    def _start_stream_run(self, stock_symbol: str, analysis_mode: str, key: str, call) -> queue.Queue:
+        """Run the streamed pipeline on a background thread that completes the single-flight call
+        
+        Returns a queue of (event, data) pairs ending with None.
+        """
+        events = queue.Queue()
+        
+        def run():
+            outcome = None
+            try:
+                for event, data in self._stream_pipeline(stock_symbol, analysis_mode):
+                    if event == 'done':
+                        outcome = data
+                    elif event == 'error':
+                        outcome = {'success': False, 'error': data['error']}
+                    events.put((event, data))
+            except Exception as e:
+                print(f"Error analyzing {stock_symbol}: {e}")
+                outcome = {'success': False, 'error': str(e)}
+                events.put(('error', {'error': str(e)}))
+            finally:
+                self.single_flight.complete(key, call, outcome or {'success': False, 'error': f"Analysis of {stock_symbol} did not finish"})
+                events.put(None)
+        
+        threading.Thread(target=run, name=f"analysis-{stock_symbol}", daemon=True).start()
+        return events
+    
+    def _replay_result(self, result: Dict):
+        """Stream events for an already computed analyze_stock result"""
+        if not result.get('success'):
+            yield 'error', {'error': result['error']}
+            return
+        yield 'quant', {'quantitative_data': result['quantitative_data']}
+        yield 'articles', {'total_articles': result['total_articles'], 'relevant_articles': result['relevant_articles']}
+        for category, analysis in result['categories'].items():
+            if category != 'sources':
+                yield 'category', dict(analysis, category=category)
+        yield 'done', result
+    
+    def _stream_pipeline(self, stock_symbol: str, analysis_mode: str):
+        """Events of one streamed pipeline run, ending with done or error"""
+        # Fetch quant data while scraping so it can be shown as soon as it arrives
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            quant_future = executor.submit(self.get_quantitative_data, stock_symbol)
+            news_future = executor.submit(self.get_stock_news, stock_symbol)
+            
+            quant_data = quant_future.result()
+            yield 'quant', {'quantitative_data': quant_data}
+            news_articles = news_future.result()
+        
+        if not news_articles and not quant_data:
+            yield 'error', {'error': f"No data found for {stock_symbol}. Please check the stock symbol and try again."}
+            return
+        
+        categorized_analysis = {}
+        relevant_docs, searched = [], 0
+        if news_articles:
+            relevant_docs, categorized_docs, searched = self._retrieve_and_categorize(stock_symbol, news_articles)
+        yield 'articles', {'total_articles': searched, 'relevant_articles': len(relevant_docs)}
+        
+        if news_articles:
+            quant_context = self._build_quant_context(stock_symbol, quant_data)
+            category_configs = self._build_category_configs(stock_symbol, quant_context)
+            pending = {category: docs for category, docs in categorized_docs.items() if docs}
             
-            # Step 4: Retrieve relevant documents
-            query = f"{stock_symbol} stock financial analysis market performance earnings revenue"
-            relevant_docs = self.retrieve_relevant_docs(query, k=min(len(news_articles), 12))
+            # Categories whose evidence is unchanged are sent straight from the last analysis
+            reused = self._reusable_analyses(stock_symbol, pending, quant_data)
+            for category, analysis in reused.items():
+                categorized_analysis[category] = analysis
+                yield 'category', dict(analysis, category=category)
+            stale = {category: docs for category, docs in pending.items() if category not in reused}
             
-            # Step 5: Categorize documents
-            categorized_docs = self.categorize_documents(relevant_docs)
+            if analysis_mode == 'single' and stale:
+                combined = self._generate_combined_analysis(stock_symbol, stale, quant_context,
+                                                            self._combined_cache_key(stock_symbol, stale, quant_data))
+                for category, analysis in combined.items():
+                    categorized_analysis[category] = analysis
+                    yield 'category', dict(analysis, category=category)
             
-            # Step 6: Generate categorized analysis
-            categorized_analysis = self.generate_categorized_analysis(stock_symbol, categorized_docs, quant_data)
-        else:
-            relevant_docs = []
-            categorized_analysis = {}
+            # Stream the remaining categories concurrently, relaying their events in arrival order
+            events = queue.Queue()
+            remaining = [category for category in stale if category not in categorized_analysis]
+            for category in remaining:
+                cache_key = self._category_cache_key(stock_symbol, category, category_configs[category], stale[category], quant_data)
+                self.llm_executor.submit(self._stream_category_analysis, category, category_configs[category], stale[category],
+                                         lambda event, data: events.put((event, data)), cache_key)
+            
+            unfinished = set(remaining)
+            deadline = time.monotonic() + self.category_stream_deadline
+            while unfinished:
+                try:
+                    event, data = events.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    # Give up on categories still waiting for the LLM so the stream always ends
+                    for category in [category for category in remaining if category in unfinished]:
+                        event, data = 'category', {'category': category, 'title': category_configs[category]['title'],
+                                                   'icon': category_configs[category]['icon'],
+                                                   'content': f"{CATEGORY_ERROR_PREFIX}: timed out"}
+                        unfinished.discard(category)
+                        categorized_analysis[category] = {key: data[key] for key in ('title', 'icon', 'content')}
+                        yield event, data
+                    break
+                if event == 'category':
+                    unfinished.discard(data['category'])
+                    categorized_analysis[data['category']] = {key: data[key] for key in ('title', 'icon', 'content')}
+                yield event, data
+            
+            # Keep the same category order as the non-streaming response
+            categorized_analysis = {category: categorized_analysis[category] for category in pending}
+            self._remember_analyses(stock_symbol, stale, quant_data, categorized_analysis)
+            categorized_analysis['sources'] = self._sources_list(categorized_docs)
         
-        return {
+        yield 'done', self._store_result(stock_symbol, analysis_mode, {
             'success': True,
             'quantitative_data': quant_data,
             'categories': categorized_analysis,
-            'total_articles': len(news_articles) if news_articles else 0,
-            'relevant_articles': len(relevant_docs)
-        }
\ No newline at end of file
+            'total_articles': searched,
+            'relevant_articles': len(relevant_docs),
+            'analysis_mode': analysis_mode
+        })
+    
+    def analyze_batch(self, stock_symbols: List[str], analysis_mode: str = None) -> Dict[str, Dict]:
+        """Analyze many symbols at once, sharing fetch, encode and index work across them
+        
+        Quant data comes from one batched download, article URLs shared between
+        symbols are embedded once in a single encode call, and retrieval for every
+        symbol is a single batched FAISS search. Returns {symbol: analyze_stock result}.
+        """
+        analysis_mode = analysis_mode or self.analysis_mode
+        if analysis_mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode '{analysis_mode}'. Use one of: {', '.join(ANALYSIS_MODES)}")
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in stock_symbols))
+        
+        # Step 1: Quant data for the whole batch in one multi-ticker download
+        quant_by_symbol = self.get_quantitative_data_batch(symbols)
+        
+        # Step 2: Scrape news for every symbol (politeness is still enforced per host)
+        with ThreadPoolExecutor(max_workers=int(os.getenv('BATCH_SCRAPE_WORKERS', '4'))) as executor:
+            news_by_symbol = dict(zip(symbols, executor.map(self.get_stock_news, symbols)))
+        
+        # Step 3: Deduplicate articles across symbols by URL and embed them in one batch
+        unique_docs = []
+        positions_by_url = {}
+        doc_positions = {}
+        for symbol in symbols:
+            positions = []
+            for doc in news_by_symbol[symbol]:
+                key = doc.get('url') or doc['title']
+                if key not in positions_by_url:
+                    positions_by_url[key] = len(unique_docs)
+                    unique_docs.append(doc)
+                if positions_by_url[key] not in positions:
+                    positions.append(positions_by_url[key])
+            doc_positions[symbol] = positions
+        
+        relevant_by_symbol = {symbol: [] for symbol in symbols}
+        relevant_positions = {symbol: [] for symbol in symbols}
+        if unique_docs:
+            embeddings = self._encode_texts([f"{doc['title']} {doc['content']}" for doc in unique_docs])
+            faiss.normalize_L2(embeddings)
+            index = faiss.IndexFlatIP(embeddings.shape[1])
+            index.add(embeddings)
+            
+            # Step 4: One batched search for every symbol's query, filtered to that symbol's articles
+            queried = [symbol for symbol in symbols if doc_positions[symbol]]
+            queries = self._encode_texts([f"{symbol} stock financial analysis market performance earnings revenue" for symbol in queried])
+            faiss.normalize_L2(queries)
+            scores, indices = index.search(queries, index.ntotal)
+            
+            for row, symbol in enumerate(queried):
+                allowed = set(doc_positions[symbol])
+                k = min(len(allowed), 12)
+                for score, idx in zip(scores[row], indices[row]):
+                    if idx in allowed:
+                        doc = unique_docs[idx].copy()
+                        doc['relevance_score'] = float(score)
+                        relevant_by_symbol[symbol].append(doc)
+                        relevant_positions[symbol].append(idx)
+                        if len(relevant_by_symbol[symbol]) == k:
+                            break
+        
+        # Steps 5-6: Categorize and generate analyses, several symbols at a time
+        def finish(symbol):
+            quant_data, news_articles = quant_by_symbol.get(symbol), news_by_symbol[symbol]
+            if not news_articles and not quant_data:
+                return {
+                    'success': False,
+                    'error': f"No data found for {symbol}. Please check the stock symbol and try again."
+                }
+            relevant_docs = relevant_by_symbol[symbol]
+            categorized_docs = self.categorize_documents(relevant_docs, embeddings[relevant_positions[symbol]] if relevant_docs else None)
+            return self._finish_analysis(symbol, quant_data, news_articles, relevant_docs, categorized_docs, analysis_mode)
+        
+        with ThreadPoolExecutor(max_workers=int(os.getenv('BATCH_ANALYSIS_WORKERS', '4'))) as executor:
+            return dict(zip(symbols, executor.map(finish, symbols)))
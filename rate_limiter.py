@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """Per-host token-bucket scheduler.
+
+    Each host gets its own bucket, so a request to one domain is only ever
+    delayed by earlier requests to that same domain. Callers reserve a token
+    under the lock and sleep outside it, which keeps waiting threads in FIFO
+    order without blocking requests to other hosts.
+
+    Background callers pass borrow=False: they only take a token that is
+    already in the bucket, so they queue behind every borrowed (foreground)
+    reservation instead of pushing it further back.
+    """
+
+    def __init__(self, rate: float = 2.0, burst: int = 2, host_rates: Dict[str, tuple] = None):
+        self.rate = rate
+        self.burst = burst
+        # Optional per-host overrides: {'seekingalpha.com': (rate, burst)}
+        self.host_rates = host_rates or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url_or_host: str) -> str:
+        host = urlparse(url_or_host).netloc if '//' in url_or_host else url_or_host
+        host = host.lower()
+        return host[4:] if host.startswith('www.') else host
+
+    def _limits(self, host: str) -> tuple:
+        return self.host_rates.get(host, (self.rate, self.burst))
+
+    def split(self, parts: int):
+        """Keep a 1/parts share of every host's rate, for limiters running side by side in separate processes
+
+        Bursts shrink too but stay at least one token, so non-borrowing callers can still acquire.
+        """
+        self.rate /= parts
+        self.burst = max(1, self.burst / parts)
+        self.host_rates = {host: (rate / parts, max(1, burst / parts)) for host, (rate, burst) in self.host_rates.items()}
+        with self._lock:
+            self._buckets = {}
+
+    def reserve(self, url_or_host: str) -> float:
+        """Take a token for the host and return how long the caller must wait before using it"""
+        host = self._host(url_or_host)
+        rate, burst = self._limits(host)
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(host, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate) - 1
+            self._buckets[host] = (tokens, now)
+        # A negative balance means the token is borrowed from the future
+        return max(0.0, -tokens / rate)
+
+    def _try_take(self, host: str) -> float:
+        """Take a token only if one is available; otherwise return how long until one may be"""
+        rate, burst = self._limits(host)
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(host, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[host] = (tokens - 1, now)
+                return 0.0
+            self._buckets[host] = (tokens, now)
+        return (1 - tokens) / rate
+
+    def acquire(self, url_or_host: str, borrow: bool = True) -> float:
+        """Block until a request to the host is allowed; returns the time spent waiting"""
+        if borrow:
+            delay = self.reserve(url_or_host)
+            if delay > 0:
+                time.sleep(delay)
+            return delay
+
+        host = self._host(url_or_host)
+        waited = 0.0
+        while True:
+            delay = self._try_take(host)
+            if delay <= 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
@@ -0,0 +1,126 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dtime, timedelta
+from typing import Callable, Dict
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8
+    from backports.zoneinfo import ZoneInfo
+
+from two_tier_store import TwoTierStore
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+
+
+def market_is_open(now: datetime = None) -> bool:
+    """Whether US equity markets are in their regular session (exchange holidays are not modelled)"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def seconds_until_open(now: datetime = None) -> float:
+    """Seconds until the next regular session opens (0 while it is open)"""
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    if market_is_open(now):
+        return 0.0
+    day = now.date() if now.time() < MARKET_OPEN else now.date() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    # Via timestamps: subtracting datetimes that share a tzinfo ignores DST changes in between
+    return datetime.combine(day, MARKET_OPEN, tzinfo=MARKET_TZ).timestamp() - now.timestamp()
+
+
+def market_ttl(now: datetime = None, open_ttl: float = 300, closed_ttl: float = 4 * 3600) -> float:
+    """Freshness lifetime for a result computed now
+
+    open_ttl during the session; outside it closed_ttl, cut short at the next
+    open so overnight results don't outlive the opening bell.
+    """
+    if market_is_open(now):
+        return open_ttl
+    return max(open_ttl, min(closed_ttl, seconds_until_open(now)))
+
+
+class ResultCache:
+    """Two-tier cache of full analysis results with stale-while-revalidate.
+
+    Results are fresh for a market-hours-aware TTL, then served as stale for up
+    to stale_ttl more seconds while revalidate() recomputes them in the
+    background (at most one refresh per key at a time). The in-memory tier is
+    an LRU of `capacity` results; the optional SQLite tier survives restarts.
+    """
+
+    def __init__(self, capacity: int = 200, sqlite_path: str = None, sqlite_capacity: int = 5000,
+                 open_ttl: float = 300, closed_ttl: float = 4 * 3600, stale_ttl: float = 6 * 3600, refresh_workers: int = 2):
+        self.open_ttl = open_ttl
+        self.closed_ttl = closed_ttl
+        self.stale_ttl = stale_ttl
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.revalidations = 0
+
+        # Values are {'fresh_until': ..., 'result': ...}; entries expire once stale_ttl has passed too
+        self._store = TwoTierStore('results', capacity, sqlite_path=sqlite_path, sqlite_capacity=sqlite_capacity)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='result-refresh')
+
+    @staticmethod
+    def key(symbol: str, mode: str) -> str:
+        return f"{symbol.upper()}:{mode}"
+
+    def get(self, key: str):
+        """(result, age_seconds, stale) for a cached result, or None on a miss"""
+        cached = self._store.get(key)
+        if cached is None:
+            return None
+        entry, created_at = cached
+        now = time.time()
+        stale = entry['fresh_until'] <= now
+        with self._lock:
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.fresh_hits += 1
+        return entry['result'], now - created_at, stale
+
+    def fresh_for(self, key: str) -> float:
+        """Seconds until a cached result goes stale (0 if it is stale or missing), without counting a lookup"""
+        cached = self._store.peek(key)
+        return max(0.0, cached[0]['fresh_until'] - time.time()) if cached else 0.0
+
+    def put(self, key: str, result: Dict):
+        fresh_until = time.time() + market_ttl(open_ttl=self.open_ttl, closed_ttl=self.closed_ttl)
+        self._store.put(key, {'fresh_until': fresh_until, 'result': result}, fresh_until + self.stale_ttl)
+
+    def revalidate(self, key: str, refresh: Callable[[], None]):
+        """Run refresh() in the background unless a refresh of this key is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self.revalidations += 1
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error refreshing cached result {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(run)
+
+    def stats(self) -> Dict:
+        return dict(
+            self._store.stats(),
+            market_open=market_is_open(),
+            fresh_hits=self.fresh_hits,
+            stale_hits=self.stale_hits,
+            revalidations=self.revalidations
+        )
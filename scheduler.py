@@ -0,0 +1,215 @@
+import time
+import atexit
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from result_cache import market_is_open, market_ttl
+
+# Background refreshes allowed per hour for each news source (keys of html_parsing.SOURCE_SPECS).
+# The six popular symbols alone take 90/h at the default 240 s market-hours interval;
+# the rest is headroom for WATCHLIST symbols (7.5/h each at priority 1).
+DEFAULT_SOURCE_BUDGETS = {'yahoo': 180, 'marketwatch': 150, 'seeking_alpha': 120}
+
+
+def parse_source_budgets(spec: str) -> Dict[str, float]:
+    """Budgets from 'yahoo=120,marketwatch=60', on top of the defaults"""
+    budgets = dict(DEFAULT_SOURCE_BUDGETS)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        source, _, per_hour = item.partition('=')
+        if source.strip() not in budgets:
+            raise ValueError(f"Unknown source '{source.strip()}' in source budgets. Use one of: {', '.join(budgets)}")
+        budgets[source.strip()] = float(per_hour)
+    return budgets
+
+
+class SourceBudgets:
+    """Hourly background-refresh budget per news source.
+
+    One token bucket per source, refilled at per_hour / 3600 tokens a second up
+    to `burst`. Every refresh scrapes all sources, so it takes a token from
+    each and can start only when all of them have one. Buckets never go
+    negative, so these budgets cap how much background scraping happens; the
+    pages themselves still go through the shared per-host limiter, where
+    background fetches take only tokens user requests haven't claimed.
+    """
+
+    def __init__(self, per_hour: Dict[str, float], burst: int = 5):
+        self.per_hour = per_hour
+        self.burst = burst
+        now = time.monotonic()
+        self._buckets = {source: (float(burst), now) for source in per_hour}
+
+    def _refill(self, now: float):
+        for source, (tokens, last) in self._buckets.items():
+            self._buckets[source] = (min(self.burst, tokens + (now - last) * self.per_hour[source] / 3600), now)
+
+    def wait_time(self) -> float:
+        """Seconds until every source has a token (0 if a refresh can start now)"""
+        self._refill(time.monotonic())
+        waits = [(1 - tokens) * 3600 / self.per_hour[source] if self.per_hour[source] > 0 else float('inf')
+                 for source, (tokens, _) in self._buckets.items() if tokens < 1]
+        return max(waits, default=0.0)
+
+    def take(self):
+        self._buckets = {source: (tokens - 1, last) for source, (tokens, last) in self._buckets.items()}
+
+    def give_back(self):
+        self._buckets = {source: (min(self.burst, tokens + 1), last) for source, (tokens, last) in self._buckets.items()}
+
+    def status(self) -> Dict:
+        self._refill(time.monotonic())
+        return {source: {'per_hour': self.per_hour[source], 'available': round(tokens, 2)}
+                for source, (tokens, _) in self._buckets.items()}
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class WatchlistScheduler:
+    """Refreshes watchlist symbols in the background so user requests find them warm.
+
+    refresh_fn(symbol, horizon) runs the analysis pipeline for one symbol unless
+    its cached result stays fresh for horizon seconds (until the next check),
+    and returns whether it did any work. Symbols are checked every
+    open_interval seconds during market hours and closed_interval outside
+    them, multiplied by (priority + 1), with +/- jitter so refreshes don't
+    line up. When more symbols are due than max_concurrency
+    allows, lower priority numbers go first; a refresh also waits for a token
+    from every source budget.
+    """
+
+    def __init__(self, refresh_fn: Callable[[str, float], bool], max_concurrency: int = 2, open_interval: float = 240,
+                 closed_interval: float = 3600, jitter: float = 0.1, source_budgets: Dict[str, float] = None):
+        self.refresh_fn = refresh_fn
+        self.max_concurrency = max_concurrency
+        self.open_interval = open_interval
+        self.closed_interval = closed_interval
+        self.jitter = jitter
+        self.budgets = SourceBudgets(source_budgets or DEFAULT_SOURCE_BUDGETS)
+
+        self._entries = {}  # symbol -> schedule and last-refresh state
+        self._in_progress = 0
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='watchlist')
+
+    def add(self, symbol: str, priority: int = 1):
+        """Watch a symbol; its first refresh is spread over the first jitter fraction of an interval"""
+        symbol = symbol.upper()
+        with self._cond:
+            if symbol in self._entries:
+                self._entries[symbol]['priority'] = min(priority, self._entries[symbol]['priority'])
+                return
+            self._entries[symbol] = {
+                'symbol': symbol, 'priority': priority, 'running': False,
+                'next_run': time.time() + random.uniform(0, self.jitter * self.open_interval),
+                'last_refresh': None, 'last_checked': None, 'last_duration': None, 'last_error': None, 'refreshes': 0
+            }
+            self._cond.notify()
+
+    def add_many(self, symbols: List[str], priority: int = 1):
+        for symbol in symbols:
+            self.add(symbol, priority)
+
+    def _interval(self, priority: int) -> float:
+        interval = market_ttl(open_ttl=self.open_interval, closed_ttl=self.closed_interval) * (priority + 1)
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _due(self, now: float) -> List[Dict]:
+        return [entry for entry in self._entries.values() if not entry['running'] and entry['next_run'] <= now]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._dispatch, name='watchlist-scheduler', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Stop dispatching; refreshes already running finish on their own"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        # Nothing is ever queued (at most max_concurrency refreshes are submitted), so there is nothing to cancel
+        self._executor.shutdown(wait=False)
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._stopping:
+                if self._in_progress >= self.max_concurrency:
+                    # Woken when a refresh finishes
+                    self._cond.wait()
+                    continue
+                now = time.time()
+                due = self._due(now)
+                if not due:
+                    upcoming = [entry['next_run'] for entry in self._entries.values() if not entry['running']]
+                    self._cond.wait(timeout=max(0.05, min(upcoming, default=now + 60) - now))
+                    continue
+                delay = self.budgets.wait_time()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+
+                entry = min(due, key=lambda item: (item['priority'], item['next_run']))
+                entry['running'] = True
+                self._in_progress += 1
+                self.budgets.take()
+                self._executor.submit(self._refresh, entry)
+
+    def _refresh(self, entry: Dict):
+        started = time.time()
+        interval = self._interval(entry['priority'])
+        refreshed, error = False, None
+        try:
+            refreshed = self.refresh_fn(entry['symbol'], interval)
+        except Exception as e:
+            error = str(e)
+            print(f"Error refreshing {entry['symbol']} in the background: {e}")
+
+        with self._cond:
+            if not refreshed and error is None:
+                # Nothing was scraped; return the budget
+                self.budgets.give_back()
+            finished = time.time()
+            entry['last_checked'] = finished
+            entry['last_error'] = error
+            if refreshed:
+                entry['last_refresh'] = finished
+                entry['last_duration'] = round(finished - started, 2)
+                entry['refreshes'] += 1
+            entry['next_run'] = finished + interval
+            entry['running'] = False
+            self._in_progress -= 1
+            self._cond.notify()
+
+    def status(self) -> Dict:
+        """Queue depth, budgets and per-symbol refresh times"""
+        with self._cond:
+            now = time.time()
+            return {
+                'running': self._thread is not None and not self._stopping,
+                'market_open': market_is_open(),
+                'max_concurrency': self.max_concurrency,
+                'in_progress': self._in_progress,
+                'queue_depth': len(self._due(now)),
+                'source_budgets': self.budgets.status(),
+                'symbols': [
+                    {
+                        'symbol': entry['symbol'],
+                        'priority': entry['priority'],
+                        'refreshing': entry['running'],
+                        'next_run_in': None if entry['running'] else max(0, round(entry['next_run'] - now)),
+                        'last_refresh': _iso(entry['last_refresh']),
+                        'last_checked': _iso(entry['last_checked']),
+                        'last_duration': entry['last_duration'],
+                        'last_error': entry['last_error'],
+                        'refreshes': entry['refreshes']
+                    }
+                    for entry in sorted(self._entries.values(), key=lambda item: (item['priority'], item['symbol']))
+                ]
+            }
@@ -0,0 +1,94 @@
+import warnings
+from typing import Dict, List
+
+import numpy as np
+
+METRICS = (
+    'current_price',
+    'price_change_1d',
+    'volatility',
+    'volume_avg',
+    'week_52_high',
+    'week_52_low',
+    'pct_from_high',
+    'pct_from_low'
+)
+
+
+def stack_bars(bars_by_symbol: Dict[str, Dict[str, np.ndarray]], columns=('close', 'high', 'low', 'volume')) -> Dict[str, np.ndarray]:
+    """Right-align each symbol's bars into (symbols x days) matrices, NaN-padding shorter histories"""
+    width = max((len(bars['close']) for bars in bars_by_symbol.values()), default=0)
+    matrices = {column: np.full((len(bars_by_symbol), width), np.nan) for column in columns}
+    for row, bars in enumerate(bars_by_symbol.values()):
+        length = len(bars['close'])
+        if length:
+            for column in columns:
+                matrices[column][row, width - length:] = bars[column]
+    return matrices
+
+
+def compute_universe_metrics(close: np.ndarray, high: np.ndarray, low: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """Compute the quant metrics for every row of (symbols x days) matrices in one vectorized pass
+
+    Rows are right-aligned (most recent bar in the last column) and may be
+    NaN-padded on the left; rows without any bars come back as NaN.
+    """
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        current_price = close[:, -1] if close.shape[1] else np.full(close.shape[0], np.nan)
+        previous_close = close[:, -2] if close.shape[1] > 1 else np.full(close.shape[0], np.nan)
+        price_change_1d = np.where(np.isnan(previous_close), 0.0, (current_price - previous_close) / previous_close * 100)
+
+        # Annualized volatility of daily returns
+        returns = close[:, 1:] / close[:, :-1] - 1
+        volatility = np.nanstd(returns, axis=1, ddof=1) * np.sqrt(252) * 100
+
+        week_52_high = np.nanmax(high, axis=1)
+        week_52_low = np.nanmin(low, axis=1)
+
+        return {
+            'current_price': current_price,
+            'price_change_1d': price_change_1d,
+            'volatility': volatility,
+            'volume_avg': np.nanmean(volume, axis=1),
+            'week_52_high': week_52_high,
+            'week_52_low': week_52_low,
+            'pct_from_high': (current_price - week_52_high) / week_52_high * 100,
+            'pct_from_low': (current_price - week_52_low) / week_52_low * 100
+        }
+
+
+def screen(symbols: List[str], metrics: Dict[str, np.ndarray], sort_by: str = 'pct_from_high', descending: bool = False,
+           filters: Dict[str, Dict] = None, limit: int = None) -> List[Dict]:
+    """Filter and sort a universe by any metric
+
+    filters maps a metric to bounds, e.g. {'volatility': {'min': 20, 'max': 60}}.
+    Symbols without price history are dropped.
+    """
+    if sort_by not in METRICS:
+        raise ValueError(f"Unknown metric '{sort_by}'. Use one of: {', '.join(METRICS)}")
+
+    mask = ~np.isnan(metrics['current_price'])
+    for metric, bounds in (filters or {}).items():
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(METRICS)}")
+        if bounds.get('min') is not None:
+            mask &= metrics[metric] >= float(bounds['min'])
+        if bounds.get('max') is not None:
+            mask &= metrics[metric] <= float(bounds['max'])
+
+    rows = np.flatnonzero(mask)
+    # NaN sort keys always go last
+    keys = metrics[sort_by][rows]
+    order = np.argsort(np.where(np.isnan(keys), np.inf, -keys if descending else keys), kind='stable')
+    rows = rows[order][:limit]
+
+    results = []
+    for row in rows:
+        result = {'symbol': symbols[row]}
+        for metric in METRICS:
+            value = float(metrics[metric][row])
+            result[metric] = None if np.isnan(value) else round(value, 2)
+        results.append(result)
+    return results
@@ -0,0 +1,85 @@
+import threading
+from typing import Callable, Dict
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Raised to a caller that gave up waiting on another caller's computation"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight computation.
+
+    The first caller for a key (the leader) runs the computation; callers that
+    arrive while it is running wait up to wait_timeout seconds and receive the
+    leader's result, or its exception. Nothing is kept once the call finishes,
+    so later callers start a new computation.
+    """
+
+    def __init__(self, wait_timeout: float = 90):
+        self.wait_timeout = wait_timeout
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> tuple:
+        """(call, is_leader); the leader must finish the call with complete()"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def complete(self, key: str, call: _Call, result=None, error: BaseException = None):
+        """Publish the leader's outcome to every waiting caller"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def wait(self, key: str, call: _Call):
+        """Result of another caller's computation, waiting at most wait_timeout seconds"""
+        if not call.done.wait(self.wait_timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise SingleFlightTimeout(f"Gave up after {self.wait_timeout:.0f}s waiting for in-flight {key}")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: str, fn: Callable, *args):
+        """fn(*args), shared with every concurrent caller using the same key"""
+        call, leader = self.acquire(key)
+        if not leader:
+            return self.wait(key, call)
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self.complete(key, call, error=e)
+            raise
+        self.complete(key, call, result)
+        return result
+
+    def stats(self) -> Dict:
+        requests = self.leaders + self.coalesced
+        return {
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts,
+            'coalesced_rate': round(self.coalesced / requests, 4) if requests else 0.0
+        }
@@ -0,0 +1,16 @@
+import os
+import re
+import json
+
+
+def symbol_filename(symbol: str) -> str:
+    """Filesystem-safe name for a ticker: uppercased, anything but letters, digits, '.', '_' and '-' replaced by '_'"""
+    return re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())
+
+
+def write_json_atomic(path: str, data):
+    """Write data as JSON through a temporary file and os.replace, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
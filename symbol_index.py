@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Callable, Dict, List
+
+import faiss
+import numpy as np
+
+from storage import symbol_filename, write_json_atomic
+
+
+def document_id(doc: Dict) -> int:
+    """Stable 63-bit FAISS id for an article, derived from its URL and title"""
+    digest = hashlib.sha1(f"{doc.get('url', '')}\0{doc['title']}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') & 0x7FFFFFFFFFFFFFFF
+
+
+class SymbolIndexStore:
+    """Per-ticker FAISS indexes persisted to disk with their document metadata.
+
+    New articles are added incrementally with add_with_ids, and articles not seen
+    for max_age_seconds are evicted with remove_ids, so a request only encodes
+    what is new or whose content changed instead of rebuilding the whole index.
+    """
+
+    def __init__(self, index_dir: str, dimension: int, max_age_seconds: float = 48 * 3600):
+        self.index_dir = index_dir
+        self.dimension = dimension
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(index_dir, exist_ok=True)
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, symbol: str) -> tuple:
+        name = symbol_filename(symbol)
+        return os.path.join(self.index_dir, f"{name}.faiss"), os.path.join(self.index_dir, f"{name}.json")
+
+    def _entry(self, symbol: str) -> Dict:
+        """Return the in-memory entry for a symbol, loading it from disk on first use"""
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None:
+                entry = {'lock': threading.Lock(), 'index': None, 'docs': None}
+                self._entries[symbol] = entry
+            return entry
+
+    def _load(self, symbol: str, entry: Dict):
+        index_path, docs_path = self._paths(symbol)
+        if os.path.exists(index_path) and os.path.exists(docs_path):
+            try:
+                index = faiss.read_index(index_path)
+                with open(docs_path) as f:
+                    docs = {int(doc_id): doc for doc_id, doc in json.load(f).items()}
+                if index.d == self.dimension and index.ntotal == len(docs):
+                    entry['index'], entry['docs'] = index, docs
+                    return
+            except Exception as e:
+                print(f"Error loading index for {symbol}: {e}")
+
+        entry['index'] = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dimension))
+        entry['docs'] = {}
+
+    def _save(self, symbol: str, entry: Dict):
+        index_path, docs_path = self._paths(symbol)
+        faiss.write_index(entry['index'], f"{index_path}.tmp")
+        os.replace(f"{index_path}.tmp", index_path)
+        write_json_atomic(docs_path, {str(doc_id): doc for doc_id, doc in entry['docs'].items()})
+
+    def update(self, symbol: str, documents: List[Dict], encode_fn: Callable) -> int:
+        """Add unseen documents, evict stale ones and persist; returns the number of documents indexed"""
+        entry = self._entry(symbol)
+        with entry['lock']:
+            if entry['index'] is None:
+                self._load(symbol, entry)
+            index, docs = entry['index'], entry['docs']
+            now = time.time()
+
+            # Evict articles that have not been seen for too long
+            stale_ids = [doc_id for doc_id, doc in docs.items() if now - doc['last_seen'] > self.max_age_seconds]
+            if stale_ids:
+                index.remove_ids(np.array(stale_ids, dtype='int64'))
+                for doc_id in stale_ids:
+                    del docs[doc_id]
+
+            new_docs = {}
+            changed_ids = []
+            for doc in documents:
+                doc_id = document_id(doc)
+                if doc_id in new_docs:
+                    continue
+                if doc_id in docs:
+                    if doc['content'] == docs[doc_id]['content']:
+                        docs[doc_id].update(doc, last_seen=now)
+                        continue
+                    # Same article with a different body (e.g. the full text instead of the headline): re-embed it
+                    changed_ids.append(doc_id)
+                    new_docs[doc_id] = dict(doc, first_seen=docs[doc_id]['first_seen'], last_seen=now)
+                else:
+                    new_docs[doc_id] = dict(doc, first_seen=now, last_seen=now)
+
+            if changed_ids:
+                index.remove_ids(np.array(changed_ids, dtype='int64'))
+            if new_docs:
+                texts = [f"{doc['title']} {doc['content']}" for doc in new_docs.values()]
+                embeddings = np.asarray(encode_fn(texts), dtype='float32')
+                faiss.normalize_L2(embeddings)
+                index.add_with_ids(embeddings, np.array(list(new_docs), dtype='int64'))
+                docs.update(new_docs)
+
+            if documents or stale_ids:
+                self._save(symbol, entry)
+            return index.ntotal
+
+    def search(self, symbol: str, query_embedding: np.ndarray, k: int, return_embeddings: bool = False):
+        """Return up to k documents for the symbol, most similar first, with relevance_score set
+
+        With return_embeddings, returns (documents, their stored normalized vectors).
+        """
+        entry = self._entry(symbol)
+        with entry['lock']:
+            if entry['index'] is None:
+                self._load(symbol, entry)
+            index, docs = entry['index'], entry['docs']
+            relevant_docs = []
+            vectors = []
+            if index.ntotal:
+                scores, ids = index.search(query_embedding, min(k, index.ntotal))
+                for score, doc_id in zip(scores[0], ids[0]):
+                    if doc_id in docs:
+                        doc = docs[doc_id].copy()
+                        doc['relevance_score'] = float(score)
+                        relevant_docs.append(doc)
+                        if return_embeddings:
+                            vectors.append(index.reconstruct(int(doc_id)))
+
+            if return_embeddings:
+                return relevant_docs, np.array(vectors, dtype='float32').reshape(len(vectors), self.dimension)
+            return relevant_docs
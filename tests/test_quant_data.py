@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quant_data
+from quant_data import QuantDataCache
+
+
+def make_history(days: int = 30, start_price: float = 100.0) -> pd.DataFrame:
+    closes = start_price + np.arange(days, dtype='float64')
+    return pd.DataFrame({
+        'Open': closes - 0.5,
+        'High': closes + 1.0,
+        'Low': closes - 1.0,
+        'Close': closes,
+        'Volume': np.full(days, 1000.0)
+    }, index=pd.date_range('2024-01-01', periods=days, freq='D'))
+
+
+class FakeFetcher:
+    """Serves canned history and info, recording every call"""
+
+    def __init__(self, symbols=('AAPL', 'MSFT', 'NVDA'), fail=False):
+        self.histories = {symbol: make_history(start_price=100.0 * (i + 1)) for i, symbol in enumerate(symbols)}
+        self.fail = fail
+        self.history_calls = []
+        self.info_calls = []
+        self._lock = threading.Lock()
+
+    def fetch_info(self, symbol):
+        with self._lock:
+            self.info_calls.append(symbol)
+        return {'longName': f'{symbol} Inc.', 'sector': 'Technology'}
+
+    def fetch_history(self, symbols, period='1y', start=None):
+        with self._lock:
+            self.history_calls.append(list(symbols))
+        if self.fail:
+            raise RuntimeError('download failed')
+        return {symbol: self.histories[symbol] for symbol in symbols if symbol in self.histories}
+
+
+class FakeClock:
+    """Stands in for the time module inside quant_data"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def fake_clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(quant_data, 'time', clock)
+    return clock
+
+
+def test_history_is_served_from_cache_within_ttl(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    fetcher = FakeFetcher()
+    cache = QuantDataCache(fetcher=fetcher, price_ttl=60)
+
+    first = cache.get('AAPL')
+    clock.now += 30
+    second = cache.get('AAPL')
+
+    assert fetcher.history_calls == [['AAPL']]
+    assert first['current_price'] == second['current_price'] == 129.0
+    assert first['company_name'] == 'AAPL Inc.'
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_history_is_refetched_after_ttl(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    fetcher = FakeFetcher()
+    cache = QuantDataCache(fetcher=fetcher, price_ttl=60, info_ttl=3600)
+
+    cache.get('AAPL')
+    clock.now += 61
+    cache.get('AAPL')
+
+    assert fetcher.history_calls == [['AAPL'], ['AAPL']]
+    # Info has a longer TTL and is still fresh
+    assert fetcher.info_calls == ['AAPL']
+    assert cache.stats()['misses'] == 2
+
+
+def test_batch_fetches_only_stale_symbols_in_one_call(monkeypatch):
+    fake_clock(monkeypatch)
+    fetcher = FakeFetcher()
+    cache = QuantDataCache(fetcher=fetcher)
+
+    cache.get('AAPL')
+    results = cache.get_many(['AAPL', 'MSFT', 'NVDA', 'MSFT'])
+
+    assert fetcher.history_calls == [['AAPL'], ['MSFT', 'NVDA']]
+    assert list(results) == ['AAPL', 'MSFT', 'NVDA']
+    assert results['MSFT']['current_price'] == 229.0
+    assert cache.stats() == {'symbols': 3, 'hits': 1, 'misses': 3, 'hit_rate': 0.25}
+
+
+def test_batch_falls_back_to_none_for_missing_symbols(monkeypatch):
+    fake_clock(monkeypatch)
+    fetcher = FakeFetcher(symbols=('AAPL',))
+    cache = QuantDataCache(fetcher=fetcher)
+
+    results = cache.get_many(['AAPL', 'ZZZZ'])
+
+    assert results['AAPL']['current_price'] == 129.0
+    assert results['ZZZZ'] is None
+
+
+def test_batch_returns_none_when_the_download_fails(monkeypatch):
+    fake_clock(monkeypatch)
+    fetcher = FakeFetcher(fail=True)
+    cache = QuantDataCache(fetcher=fetcher)
+
+    assert cache.get_many(['AAPL', 'MSFT']) == {'AAPL': None, 'MSFT': None}
+    assert fetcher.info_calls == []
+
+
+def test_counters_are_exact_under_concurrency():
+    fetcher = FakeFetcher()
+    cache = QuantDataCache(fetcher=fetcher, price_ttl=3600)
+    cache.get_bars_many(['AAPL', 'MSFT', 'NVDA'])
+
+    def lookups():
+        for _ in range(200):
+            cache.get_bars_many(['AAPL', 'MSFT', 'NVDA'])
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.stats()['hits'] == 8 * 200 * 3
+    assert cache.stats()['misses'] == 3
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+
+class TwoTierStore:
+    """In-memory LRU in front of an optional SQLite table, with a deadline per entry.
+
+    The memory tier holds up to `capacity` entries; the SQLite tier keeps up to
+    `sqlite_capacity` across restarts and promotes hits back into memory.
+    Entries are dropped from both tiers once their expires_at passes. Every
+    PRUNE_EVERY writes, expired rows and the least recently written rows
+    beyond sqlite_capacity are deleted. Values must be JSON-serializable.
+    """
+
+    PRUNE_EVERY = 100
+    COLUMNS = ['key', 'value', 'stored_at', 'expires_at']
+
+    def __init__(self, table: str, capacity: int, sqlite_path: str = None, sqlite_capacity: int = 10000):
+        self.table = table
+        self.capacity = capacity
+        self.sqlite_capacity = sqlite_capacity
+        self.memory_hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()  # key -> (stored_at, expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        self._db = None
+        if sqlite_path:
+            os.makedirs(os.path.dirname(sqlite_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            columns = [row[1] for row in self._db.execute(f"PRAGMA table_info({table})")]
+            if columns and columns != self.COLUMNS:
+                # Left by an older layout; it only ever held cached data
+                self._db.execute(f"DROP TABLE {table}")
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, stored_at REAL, expires_at REAL)")
+            self._db.commit()
+
+    def _lookup(self, key: str, promote: bool) -> tuple:
+        """(entry, tier) for a live entry, or (None, None); call with the lock held"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                if promote:
+                    self._entries.move_to_end(key)
+                return entry, 'memory'
+            del self._entries[key]
+
+        if self._db is not None:
+            row = self._db.execute(f"SELECT stored_at, expires_at, value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row and row[1] > now:
+                entry = (row[0], row[1], json.loads(row[2]))
+                if promote:
+                    self._remember(key, entry)
+                return entry, 'sqlite'
+        return None, None
+
+    def get(self, key: str):
+        """(value, stored_at) for a live entry, or None on a miss"""
+        with self._lock:
+            entry, tier = self._lookup(key, promote=True)
+            if entry is None:
+                self.misses += 1
+                return None
+            if tier == 'memory':
+                self.memory_hits += 1
+            else:
+                self.sqlite_hits += 1
+            return entry[2], entry[0]
+
+    def peek(self, key: str):
+        """Like get, without counting a lookup or refreshing the entry's recency"""
+        with self._lock:
+            entry, _ = self._lookup(key, promote=False)
+        return None if entry is None else (entry[2], entry[0])
+
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def put(self, key: str, value, expires_at: float):
+        entry = (time.time(), expires_at, value)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                                 (key, json.dumps(value), entry[0], expires_at))
+                self._puts += 1
+                if self._puts % self.PRUNE_EVERY == 0:
+                    self._prune()
+                self._db.commit()
+
+    def _prune(self):
+        """Drop expired rows, then the least recently written rows beyond sqlite_capacity"""
+        self._db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.sqlite_capacity,)
+        )
+
+    def stats(self) -> Dict:
+        hits = self.memory_hits + self.sqlite_hits
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'capacity': self.capacity,
+            'hits': hits,
+            'memory_hits': self.memory_hits,
+            'sqlite_hits': self.sqlite_hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }